@@ -4,16 +4,134 @@ Updated for 4-color Punto rules (5-in-a-row of same color to win).
 Enhanced with board analysis and tactical prompting for stronger play.
 """
 
+import asyncio
+import functools
+import importlib.util
 import json
-import re
-from typing import Dict, List, Optional, Tuple
+import logging
+import os
+import random
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+from game_logic import COLOR_SYMBOLS, PLAYER_COLORS
+
+log = logging.getLogger(__name__)
+
+_DECODER = json.JSONDecoder()
+
+
+# Precomputed card labels, e.g. CARD_LABELS['red'][7] == 'R7'
+CARD_LABELS = {color: tuple(f"{sym}{v}" for v in range(10)) for color, sym in COLOR_SYMBOLS.items()}
+
+# Board rendering pieces for _format_board_for_ai (never change)
+_BOARD_HEADER = "     0   1   2   3   4   5\n"
+_BOARD_SEP = "   +---+---+---+---+---+---+\n"
+_EMPTY_CELL = " . |"
+_BOARD_LEGEND = "\nR=Red, B=Blue (claude) | G=Green, Y=Yellow (openai) | .=empty"
+_COMPACT_HEADER = "   0  1  2  3  4  5"
+_DIRECTION_ABBR = {"horizontal": "H", "vertical": "V", "diagonal-DR": "DR", "diagonal-UR": "UR"}
+
+# Explains the compact board/tactics notation; part of the static (cacheable) prompt prefix
+_COMPACT_NOTATION = """NOTATION:
+- Board: rows y 0-5 top to bottom, columns x 0-5. "R3" = red card of value 3, ".." = empty.
+- Lines: <color><length> <H|V|DR|UR> <cells> | ext <cell>E (empty) or <cell>vN (card of value N).
+
+"""
+
+# Integer color codes for the flat 36-cell grid used by the line scanner (0 = empty)
+COLOR_CODES = {'red': 1, 'blue': 2, 'green': 3, 'yellow': 4}
+CODE_COLORS = (None, 'red', 'blue', 'green', 'yellow')
+
+
+def _build_scan_lines():
+    """Precompute every board line per direction as (x, y, flat_index) tuples."""
+    scan_lines = []
+    for dx, dy, dir_name in [(1, 0, "horizontal"), (0, 1, "vertical"),
+                             (1, 1, "diagonal-DR"), (1, -1, "diagonal-UR")]:
+        dir_lines = []
+        for y in range(6):
+            for x in range(6):
+                # Lines start at cells whose predecessor is off-board
+                if 0 <= x - dx < 6 and 0 <= y - dy < 6:
+                    continue
+                line = []
+                cx, cy = x, y
+                while 0 <= cx < 6 and 0 <= cy < 6:
+                    line.append((cx, cy, cy * 6 + cx))
+                    cx += dx
+                    cy += dy
+                if len(line) >= 2:
+                    dir_lines.append(tuple(line))
+        scan_lines.append((dir_name, tuple(dir_lines)))
+    return tuple(scan_lines)
+
+
+_SCAN_LINES = _build_scan_lines()
+
+
+@functools.lru_cache(maxsize=4096)
+def _scan_runs(colors: bytes) -> Tuple[Tuple[int, str, Tuple, int, int], ...]:
+    """Integer kernel of the line scan: every maximal same-color run of length >= 2 as
+    (color_code, direction, line, start, end), with line[start:end] the run's cells.
+    Runs depend only on colors (not values), so this is cached on the 36 color bytes."""
+    runs = []
+    # Walk each precomputed board line once, splitting it into maximal same-color runs
+    for dir_name, scan_lines in _SCAN_LINES:
+        for line in scan_lines:
+            n = len(line)
+            i = 0
+            while i < n:
+                code = colors[line[i][2]]
+                j = i + 1
+                if code:
+                    while j < n and colors[line[j][2]] == code:
+                        j += 1
+                if j - i >= 2:
+                    runs.append((code, dir_name, line, i, j))
+                i = j
+    return tuple(runs)
+
+# Bit i = flat cell i. _ADJ_MASK[i] has the bits of the up-to-8 neighbours of cell i
+_ADJ_MASK = tuple(
+    sum(1 << (ny * 6 + nx)
+        for ny in range(y - 1, y + 2) for nx in range(x - 1, x + 2)
+        if (nx, ny) != (x, y) and 0 <= nx < 6 and 0 <= ny < 6)
+    for y in range(6) for x in range(6)
+)
+
+# Card labels indexed by color code, e.g. CODE_CARD_LABELS[1][7] == 'R7'
+CODE_CARD_LABELS = (None,) + tuple(CARD_LABELS[color] for color in CODE_COLORS[1:])
+
+# Packed board: (colors, values), two row-major bytearray(36); colors[i] == 0 means empty
+Grid = Tuple[bytearray, bytearray]
+
+
+def _encode_board(board: List[List]) -> Grid:
+    """Pack the list-of-dicts board into flat color-code and value arrays (done once per prompt)."""
+    colors = bytearray(36)
+    values = bytearray(36)
+    i = 0
+    for row in board:
+        for cell in row:
+            if cell is not None:
+                colors[i] = COLOR_CODES[cell['color']]
+                values[i] = cell['value']
+            i += 1
+    return colors, values
+
+
+def _format_board_compact(grid: Grid) -> str:
+    """One short row per board row, e.g. "2  .. .. R3 .. B2 .." (x across, y down)."""
+    colors, values = grid
+    rows = [_COMPACT_HEADER]
+    for y in range(6):
+        cells = [CODE_CARD_LABELS[colors[i]][values[i]] if colors[i] else ".."
+                 for i in range(y * 6, y * 6 + 6)]
+        rows.append(f"{y}  {' '.join(cells)}")
+    return "\n".join(rows)
 
-COLOR_SYMBOLS = {'red': 'R', 'blue': 'B', 'green': 'G', 'yellow': 'Y'}
-PLAYER_COLORS = {
-    'claude': ['red', 'blue'],
-    'openai': ['green', 'yellow'],
-}
 
 SYSTEM_PROMPT = """You are an expert Punto card game AI. You play strategically and precisely.
 
@@ -27,261 +145,483 @@ Key principles:
 - Use your high-value cards (7-9) for captures and critical positions. Don't waste them on empty cells early.
 - Use low-value cards (1-3) to fill empty cells and extend lines.
 
-You must respond with ONLY a JSON object. No explanation outside the JSON."""
+Give your move in the requested move format only; put any explanation in its reasoning field."""
+
+
+DEFAULT_MODELS = {
+    'claude': "claude-sonnet-4-5-20250929",
+    'openai': "gpt-4o",
+    'gemini': "gemini-2.0-flash",
+}
+
+# The reply is a single small JSON object; a tight output budget keeps latency down
+MAX_MOVE_TOKENS = 256
+# OpenAI reasoning models (o1, o3, ...) spend hidden reasoning tokens out of the same
+# completion budget, so they need room beyond the reply itself
+REASONING_MODEL_PREFIXES = ("o1", "o3", "o4")
+MAX_REASONING_MOVE_TOKENS = 8192
+
+# Schema for a move reply; each provider's structured-output mode enforces it
+MOVE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "x": {"type": "integer", "description": "column 0-5"},
+        "y": {"type": "integer", "description": "row 0-5"},
+        "card_value": {"type": "integer", "description": "value from your hand"},
+        "card_color": {"type": "string", "enum": ["red", "blue", "green", "yellow"]},
+        "reasoning": {"type": "string", "description": "1-2 sentence strategy explanation"},
+    },
+    "required": ["x", "y", "card_value", "card_color", "reasoning"],
+}
+CLAUDE_MOVE_TOOL = {
+    "name": "play_move",
+    "description": "Play one card from your hand onto the board.",
+    "input_schema": MOVE_SCHEMA,
+}
+OPENAI_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "move",
+        "strict": True,
+        "schema": {**MOVE_SCHEMA, "additionalProperties": False},
+    },
+}
+GEMINI_GENERATION_CONFIG = {
+    "max_output_tokens": MAX_MOVE_TOKENS,
+    "response_mime_type": "application/json",
+    "response_schema": MOVE_SCHEMA,
+}
+
+
+def _tool_input(message) -> Dict:
+    """Pull the forced play_move tool call out of a Claude message."""
+    for block in message.content:
+        if block.type == "tool_use":
+            return block.input
+    raise ValueError("No play_move tool call in response")
+
+
+# Provider SDK per api_type: (module, pip package). Imported only when that provider is used.
+_SDK_MODULES = {
+    'claude': ("anthropic", "anthropic"),
+    'openai': ("openai", "openai"),
+    'gemini': ("google.generativeai", "google-generativeai"),
+}
+
+
+def _import_sdk(api_type: str) -> Any:
+    module_name, package = _SDK_MODULES[api_type]
+    # sys.modules hit skips the import machinery on repeated AIPlayer construction
+    module = sys.modules.get(module_name)
+    if module is None:
+        try:
+            module = importlib.import_module(module_name)
+        except ImportError:
+            raise ImportError(f"Install: pip install {package}")
+    return module
+
+
+def _pooled_http_client():
+    """httpx client with a wide keep-alive pool; HTTP/2 multiplexing when h2 is installed."""
+    import httpx
+    return httpx.Client(
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=100),
+    )
+
+
+def _build_client(api_type: str, model: str) -> Any:
+    sdk = _import_sdk(api_type)
+    if api_type == "claude":
+        return sdk.Anthropic(http_client=_pooled_http_client())
+    elif api_type == "openai":
+        return sdk.OpenAI(http_client=_pooled_http_client())
+    sdk.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    return sdk.GenerativeModel(model)
+
+
+def _build_async_client(api_type: str) -> Any:
+    sdk = _import_sdk(api_type)
+    if api_type == "claude":
+        return sdk.AsyncAnthropic()
+    return sdk.AsyncOpenAI()
 
 
 class AIPlayer:
-    def __init__(self, player_name: str, api_type: str = "claude", model: Optional[str] = None):
+    # (api_type, model-or-None) -> provider client, shared by every AIPlayer instance
+    _shared_clients: Dict[Tuple[str, Optional[str]], Any] = {}
+
+    def __init__(self, player_name: str, api_type: str = "claude", model: Optional[str] = None,
+                 verbose: bool = False):
         self.player_name = player_name
         self.api_type = api_type
         self.move_history = []
-
-        if api_type == "claude":
-            try:
-                import anthropic
-                self.client = anthropic.Anthropic()
-                self.model = model or "claude-sonnet-4-5-20250929"
-            except ImportError:
-                raise ImportError("Install: pip install anthropic")
-        elif api_type == "openai":
-            try:
-                import openai
-                self.client = openai.OpenAI()
-                self.model = model or "gpt-4o"
-            except ImportError:
-                raise ImportError("Install: pip install openai")
-        elif api_type == "gemini":
-            try:
-                import google.generativeai as genai
-                import os
-                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-                self.model = model or "gemini-2.0-flash"
-                self.client = genai.GenerativeModel(self.model)
-            except ImportError:
-                raise ImportError("Install: pip install google-generativeai")
-        else:
+        # verbose=True keeps the ASCII-grid board and prose tactics (easier to read when debugging);
+        # the default compact notation uses a fraction of the input tokens
+        self.verbose = verbose
+        self._static_prompt = self._build_static_prompt()
+
+        self.client, self.model = self._make_client(api_type, model)
+        self._async_client = None
+        self._async_loop = None
+
+    @classmethod
+    def _make_client(cls, api_type: str, model: Optional[str]) -> Tuple[Any, str]:
+        """Return (client, model). One client per provider (per model for Gemini), shared by all
+        players so they share a connection pool; the SDK is imported on first use only."""
+        if api_type not in DEFAULT_MODELS:
             raise ValueError(f"Unknown API type: {api_type}")
+        model = model or DEFAULT_MODELS[api_type]
+        key = (api_type, model if api_type == "gemini" else None)
+        client = cls._shared_clients.get(key)
+        if client is None:
+            client = cls._shared_clients[key] = _build_client(api_type, model)
+        return client, model
 
     def get_move(self, board: List[List], hand: List[Dict], opponent_hand_size: int) -> Dict:
-        prompt = self._create_prompt(board, hand, opponent_hand_size)
+        static_prompt, dynamic_prompt = self._create_prompt_parts(board, hand, opponent_hand_size)
+        prompt = static_prompt + dynamic_prompt
 
         try:
             if self.api_type == "claude":
-                response = self.client.messages.create(
-                    model=self.model,
-                    max_tokens=512,
-                    system=SYSTEM_PROMPT,
-                    messages=[{"role": "user", "content": prompt}]
-                )
-                move_text = response.content[0].text
+                response = self.client.messages.create(**self._claude_params(static_prompt, dynamic_prompt))
+                reply = _tool_input(response)
             elif self.api_type == "gemini":
-                response = self.client.generate_content(SYSTEM_PROMPT + "\n\n" + prompt)
-                move_text = response.text
+                response = self.client.generate_content(
+                    SYSTEM_PROMPT + "\n\n" + prompt, generation_config=GEMINI_GENERATION_CONFIG)
+                reply = response.text
             else:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": SYSTEM_PROMPT},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.3
-                )
-                move_text = response.choices[0].message.content
-
-            move = self._parse_move(move_text, hand)
+                response = self.client.chat.completions.create(**self._openai_params(prompt))
+                reply = response.choices[0].message.content
+
+            move = self._parse_move(reply, hand)
             self.move_history.append(move)
             return move
 
         except Exception as e:
-            print(f"AI Error ({self.api_type}): {e}")
+            log.warning("AI Error (%s): %s", self.api_type, e)
             return self._random_fallback_move(board, hand)
 
-    def _analyze_lines(self, board: List[List]) -> Dict:
-        """Scan board for color sequences in all directions. Returns analysis dict."""
-        directions = [
-            (1, 0, "horizontal"),
-            (0, 1, "vertical"),
-            (1, 1, "diagonal-DR"),
-            (1, -1, "diagonal-UR"),
+    async def get_move_async(self, board: List[List], hand: List[Dict], opponent_hand_size: int) -> Dict:
+        """Non-blocking get_move, so many games/players can wait on their APIs concurrently."""
+        static_prompt, dynamic_prompt = self._create_prompt_parts(board, hand, opponent_hand_size)
+        prompt = static_prompt + dynamic_prompt
+
+        try:
+            if self.api_type == "claude":
+                response = await self._get_async_client().messages.create(
+                    **self._claude_params(static_prompt, dynamic_prompt))
+                reply = _tool_input(response)
+            elif self.api_type == "gemini":
+                response = await self.client.generate_content_async(
+                    SYSTEM_PROMPT + "\n\n" + prompt, generation_config=GEMINI_GENERATION_CONFIG)
+                reply = response.text
+            else:
+                response = await self._get_async_client().chat.completions.create(**self._openai_params(prompt))
+                reply = response.choices[0].message.content
+
+            move = self._parse_move(reply, hand)
+            self.move_history.append(move)
+            return move
+
+        except Exception as e:
+            log.warning("AI Error (%s): %s", self.api_type, e)
+            return self._random_fallback_move(board, hand)
+
+    @classmethod
+    async def gather_moves(cls, requests: List[Tuple["AIPlayer", List[List], List[Dict], int]]) -> List[Dict]:
+        """Resolve (player, board, hand, opponent_hand_size) turns concurrently, e.g. one per parallel game.
+
+        Usage: moves = asyncio.run(AIPlayer.gather_moves(requests))
+        """
+        return await asyncio.gather(*(
+            player.get_move_async(board, hand, opp) for player, board, hand, opp in requests
+        ))
+
+    def _get_async_client(self) -> Any:
+        # Async HTTP pools are bound to the event loop that opened them, so rebuild per loop
+        loop = asyncio.get_running_loop()
+        if self._async_loop is not loop:
+            self._async_client = _build_async_client(self.api_type)
+            self._async_loop = loop
+        return self._async_client
+
+    def _claude_params(self, static_prompt: str, dynamic_prompt: str) -> Dict:
+        # One cache breakpoint after the per-player instructions: the prefix it marks is the
+        # tool definition + system prompt + static prompt. Anthropic only caches prefixes of at
+        # least 1024 tokens (2048 on Haiku) and silently ignores the marker below that, which
+        # this prefix (~900 tokens) currently is; it takes effect once the rules grow past it
+        return {
+            "model": self.model,
+            "max_tokens": MAX_MOVE_TOKENS,
+            "system": SYSTEM_PROMPT,
+            "messages": [{
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": static_prompt, "cache_control": {"type": "ephemeral"}},
+                    {"type": "text", "text": dynamic_prompt},
+                ],
+            }],
+            "tools": [CLAUDE_MOVE_TOOL],
+            "tool_choice": {"type": "tool", "name": CLAUDE_MOVE_TOOL["name"]},
+        }
+
+    def _openai_params(self, prompt: str) -> Dict:
+        params = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            "response_format": OPENAI_RESPONSE_FORMAT,
+        }
+        if self.model.startswith(REASONING_MODEL_PREFIXES):
+            # Reasoning models reject max_tokens and temperature; 256 tokens would all go to
+            # hidden reasoning and leave an empty reply
+            params["max_completion_tokens"] = MAX_REASONING_MOVE_TOKENS
+        else:
+            params["temperature"] = 0.3
+            params["max_tokens"] = MAX_MOVE_TOKENS
+        return params
+
+    @classmethod
+    def batch_get_moves(cls, requests: List[Tuple["AIPlayer", List[List], List[Dict], int]],
+                        poll_interval: float = 10.0) -> List[Dict]:
+        """Resolve many turns at once via the provider Batch APIs (half price, no rate-limit churn).
+
+        requests: (player, board, hand, opponent_hand_size) tuples, possibly from different games.
+        Returns one move per request, in order. Batches can take minutes to complete,
+        so this is meant for offline tournaments — live games should keep using get_move.
+        """
+        moves: List[Optional[Dict]] = [None] * len(requests)
+        prompts = [player._create_prompt_parts(board, hand, opp) for player, board, hand, opp in requests]
+
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for i, (player, _, _, _) in enumerate(requests):
+            groups.setdefault((player.api_type, player.model), []).append(i)
+
+        for (api_type, _), indices in groups.items():
+            try:
+                if api_type == "claude":
+                    replies = cls._run_claude_batch(requests, prompts, indices, poll_interval)
+                elif api_type == "openai":
+                    replies = cls._run_openai_batch(requests, prompts, indices, poll_interval)
+                else:
+                    # Gemini has no batch endpoint here; resolve turn by turn
+                    for i in indices:
+                        player, board, hand, opp = requests[i]
+                        moves[i] = player.get_move(board, hand, opp)
+                    continue
+            except Exception as e:
+                log.warning("AI Batch Error (%s): %s", api_type, e)
+                replies = {}
+
+            for i in indices:
+                player, board, hand, _ = requests[i]
+                try:
+                    if i not in replies:
+                        raise ValueError("No batch result")
+                    move = player._parse_move(replies[i], hand)
+                    player.move_history.append(move)
+                except Exception as e:
+                    log.warning("AI Error (%s): %s", api_type, e)
+                    move = player._random_fallback_move(board, hand)
+                moves[i] = move
+
+        return moves
+
+    @staticmethod
+    def _run_claude_batch(requests, prompts, indices, poll_interval) -> Dict[int, Dict]:
+        client = requests[indices[0]][0].client
+        batch = client.messages.batches.create(requests=[
+            {"custom_id": str(i), "params": requests[i][0]._claude_params(*prompts[i])}
+            for i in indices
+        ])
+        while batch.processing_status != "ended":
+            time.sleep(poll_interval)
+            batch = client.messages.batches.retrieve(batch.id)
+
+        replies = {}
+        for entry in client.messages.batches.results(batch.id):
+            if entry.result.type == "succeeded":
+                replies[int(entry.custom_id)] = _tool_input(entry.result.message)
+        return replies
+
+    @staticmethod
+    def _run_openai_batch(requests, prompts, indices, poll_interval) -> Dict[int, str]:
+        client = requests[indices[0]][0].client
+        lines = [
+            json.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": requests[i][0]._openai_params("".join(prompts[i])),
+            })
+            for i in indices
         ]
+        batch_file = client.files.create(file=("moves.jsonl", "\n".join(lines).encode()), purpose="batch")
+        batch = client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            time.sleep(poll_interval)
+            batch = client.batches.retrieve(batch.id)
+
+        replies = {}
+        if batch.output_file_id:
+            for line in client.files.content(batch.output_file_id).text.splitlines():
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                if response.get("status_code") == 200:
+                    replies[int(entry["custom_id"])] = response["body"]["choices"][0]["message"]["content"]
+        return replies
 
+    @staticmethod
+    def _analyze_lines(grid: Grid) -> Dict:
+        """Scan board for color sequences in all directions. Returns analysis dict."""
+        colors, values = grid
         lines = {color: [] for color in ['red', 'blue', 'green', 'yellow']}
 
-        # Scan for sequences of same color
-        for dx, dy, dir_name in directions:
-            # Determine scan range
-            for start_y in range(6):
-                for start_x in range(6):
-                    # Try to build a sequence from this starting cell
-                    cell = board[start_y][start_x]
-                    if cell is None:
-                        continue
-
-                    color = cell['color']
-                    seq = [(start_x, start_y)]
-                    x, y = start_x + dx, start_y + dy
-
-                    while 0 <= x < 6 and 0 <= y < 6:
-                        c = board[y][x]
-                        if c is not None and c['color'] == color:
-                            seq.append((x, y))
-                            x += dx
-                            y += dy
-                        else:
-                            break
-
-                    if len(seq) >= 2:
-                        # Find extension points (empty or capturable cells at both ends)
-                        extends = []
-                        # Before start
-                        bx, by = start_x - dx, start_y - dy
-                        if 0 <= bx < 6 and 0 <= by < 6:
-                            bc = board[by][bx]
-                            if bc is None:
-                                extends.append((bx, by, None))
-                            else:
-                                extends.append((bx, by, bc['value']))
-                        # After end
-                        ex, ey = seq[-1][0] + dx, seq[-1][1] + dy
-                        if 0 <= ex < 6 and 0 <= ey < 6:
-                            ec = board[ey][ex]
-                            if ec is None:
-                                extends.append((ex, ey, None))
-                            else:
-                                extends.append((ex, ey, ec['value']))
-
-                        # Avoid duplicate sequences (only record if start is the "smallest" point)
-                        key = (color, tuple(seq), dir_name)
-                        if color not in lines:
-                            lines[color] = []
-
-                        # Check we haven't already recorded a superset
-                        is_subset = False
-                        for existing in lines[color]:
-                            if set(seq).issubset(set(existing['cells'])):
-                                is_subset = True
-                                break
-                        if not is_subset:
-                            # Remove any subsets of this new sequence
-                            lines[color] = [
-                                e for e in lines[color]
-                                if not set(e['cells']).issubset(set(seq))
-                            ]
-                            lines[color].append({
-                                'length': len(seq),
-                                'cells': seq,
-                                'direction': dir_name,
-                                'extends': extends,
-                            })
+        for code, dir_name, line, i, j in _scan_runs(bytes(colors)):
+            # Find extension points (empty or capturable cells at both ends)
+            extends = []
+            for k in (i - 1, j):
+                if 0 <= k < len(line):
+                    ex, ey, ei = line[k]
+                    extends.append((ex, ey, values[ei] if colors[ei] else None))
+
+            lines[CODE_COLORS[code]].append({
+                'length': j - i,
+                'cells': [(x, y) for x, y, _ in line[i:j]],
+                'direction': dir_name,
+                'extends': extends,
+            })
 
         return lines
 
-    def _get_valid_moves(self, board: List[List], hand: List[Dict]) -> List[Dict]:
+    def _get_valid_moves(self, grid: Grid, hand: List[Dict]) -> List[Dict]:
         """Return all valid moves with annotations. Enforces adjacency rule."""
+        colors, values = grid
         moves = []
-        # Check if board is empty (first move — unrestricted placement)
-        board_empty = all(board[r][c] is None for r in range(6) for c in range(6))
+        # 36-bit occupancy mask; zero means the board is empty (first move — unrestricted placement)
+        occ = 0
+        for i, code in enumerate(colors):
+            if code:
+                occ |= 1 << i
+        board_empty = occ == 0
+        own_codes = {COLOR_CODES[c] for c in PLAYER_COLORS.get(self.player_name, [])}
 
         for card in hand:
-            for y in range(6):
-                for x in range(6):
-                    cell = board[y][x]
-                    if cell is None:
-                        # Adjacency check: must be next to existing card (unless first move)
-                        if not board_empty and not self._is_adjacent(board, x, y):
-                            continue
-                        moves.append({'x': x, 'y': y, 'card': card, 'type': 'place'})
-                    elif cell['value'] < card['value']:
-                        owner = 'own' if cell['color'] in PLAYER_COLORS.get(self.player_name, []) else 'opponent'
-                        moves.append({
-                            'x': x, 'y': y, 'card': card,
-                            'type': f'capture_{owner}',
-                            'captures': f"{COLOR_SYMBOLS[cell['color']]}{cell['value']}"
-                        })
+            for i in range(36):
+                y, x = divmod(i, 6)
+                code = colors[i]
+                if not code:
+                    # Adjacency check: must be next to existing card (unless first move)
+                    if not board_empty and not self._is_adjacent(occ, i):
+                        continue
+                    moves.append({'x': x, 'y': y, 'card': card, 'type': 'place'})
+                elif values[i] < card['value']:
+                    owner = 'own' if code in own_codes else 'opponent'
+                    moves.append({
+                        'x': x, 'y': y, 'card': card,
+                        'type': f'capture_{owner}',
+                        'captures': CODE_CARD_LABELS[code][values[i]],
+                    })
         return moves
 
     @staticmethod
-    def _is_adjacent(board, x, y):
-        """Check if (x,y) is adjacent (8 directions) to any existing card."""
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                if dx == 0 and dy == 0:
-                    continue
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < 6 and 0 <= ny < 6:
-                    if board[ny][nx] is not None:
-                        return True
-        return False
+    def _is_adjacent(occ: int, i: int) -> bool:
+        """Check if flat cell i is adjacent (8 directions) to any occupied cell in mask occ."""
+        return (occ & _ADJ_MASK[i]) != 0
 
-    def _format_tactical_analysis(self, board: List[List], hand: List[Dict]) -> str:
+    def _format_tactical_analysis(self, grid: Grid, hand: List[Dict]) -> str:
         """Pre-compute tactical situation and format as text for the LLM."""
-        lines = self._analyze_lines(board)
-        my_colors = PLAYER_COLORS.get(self.player_name, [])
-        opp_name = 'openai' if self.player_name == 'claude' else 'claude'
+        colors, values = grid
+        return self._tactical_analysis_text(self.player_name, bytes(colors), bytes(values), self.verbose)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=4096)
+    def _tactical_analysis_text(player_name: str, colors: bytes, values: bytes, verbose: bool) -> str:
+        # Pure function of (player, board); openings recur across games, so results are memoized
+        # keyed on the packed board bytes (exact, so no hash collisions to worry about)
+        lines = AIPlayer._analyze_lines((colors, values))
+        my_colors = PLAYER_COLORS.get(player_name, [])
+        opp_name = 'openai' if player_name == 'claude' else 'claude'
         opp_colors = PLAYER_COLORS.get(opp_name, [])
 
-        analysis = []
+        if not verbose:
+            return AIPlayer._format_tactics_compact(lines, my_colors, opp_colors)
 
-        # My threats (lines I'm building)
-        my_lines = []
-        for color in my_colors:
-            for line in lines.get(color, []):
-                if line['length'] >= 2:
-                    my_lines.append((color, line))
-
-        if my_lines:
-            analysis.append("YOUR LINES:")
-            for color, line in sorted(my_lines, key=lambda x: -x[1]['length']):
-                cells_str = " -> ".join(f"({x},{y})" for x, y in line['cells'])
-                ext_str = ""
-                if line['extends']:
-                    exts = []
-                    for ex, ey, val in line['extends']:
-                        if val is None:
-                            exts.append(f"({ex},{ey}) EMPTY")
-                        else:
-                            exts.append(f"({ex},{ey}) has value {val}")
-                    ext_str = f" | Can extend to: {', '.join(exts)}"
-                sym = COLOR_SYMBOLS[color]
-                analysis.append(f"  {sym} {line['length']}-in-a-row {line['direction']}: {cells_str}{ext_str}")
-                if line['length'] == 4:
-                    analysis.append(f"  >>> YOU CAN WIN! Extend this {sym} line to 5! <<<")
-
-        # Opponent threats
-        opp_lines = []
-        for color in opp_colors:
-            for line in lines.get(color, []):
-                if line['length'] >= 2:
-                    opp_lines.append((color, line))
-
-        if opp_lines:
-            analysis.append("OPPONENT LINES:")
-            for color, line in sorted(opp_lines, key=lambda x: -x[1]['length']):
-                cells_str = " -> ".join(f"({x},{y})" for x, y in line['cells'])
-                ext_str = ""
-                if line['extends']:
-                    exts = []
-                    for ex, ey, val in line['extends']:
-                        if val is None:
-                            exts.append(f"({ex},{ey}) EMPTY")
-                        else:
-                            exts.append(f"({ex},{ey}) has value {val}")
-                    ext_str = f" | Extends to: {', '.join(exts)}"
-                sym = COLOR_SYMBOLS[color]
-                analysis.append(f"  {sym} {line['length']}-in-a-row {line['direction']}: {cells_str}{ext_str}")
-                if line['length'] == 4:
-                    analysis.append(f"  >>> DANGER! Block this {sym} line or you LOSE! <<<")
-                elif line['length'] == 3:
-                    analysis.append(f"  ** WARNING: 3-in-a-row threat — consider blocking **")
+        my_lines = [(color, line) for color in my_colors for line in lines.get(color, [])]
+        opp_lines = [(color, line) for color in opp_colors for line in lines.get(color, [])]
+
+        analysis = []
+        # My threats (lines I'm building), then opponent threats
+        AIPlayer._format_line_block(analysis, "YOUR LINES:", my_lines, "Can extend to",
+                                    "  >>> YOU CAN WIN! Extend this {sym} line to 5! <<<", None)
+        AIPlayer._format_line_block(analysis, "OPPONENT LINES:", opp_lines, "Extends to",
+                                    "  >>> DANGER! Block this {sym} line or you LOSE! <<<",
+                                    "  ** WARNING: 3-in-a-row threat — consider blocking **")
 
         if not my_lines and not opp_lines:
             analysis.append("No significant lines yet. Focus on center control and starting a same-color sequence.")
 
         return "\n".join(analysis)
 
-    def _format_valid_moves_compact(self, board: List[List], hand: List[Dict]) -> str:
+    @staticmethod
+    def _format_line_block(analysis: List[str], label: str, side: List[Tuple[str, Dict]], ext_label: str,
+                           four_msg: Optional[str], three_msg: Optional[str]) -> None:
+        """Append one side's verbose line listing (longest first) to analysis, with the
+        4- and 3-in-a-row callouts for that side; four_msg may reference {sym}."""
+        if not side:
+            return
+        analysis.append(label)
+        for color, line in sorted(side, key=lambda x: -x[1]['length']):
+            cells_str = " -> ".join(f"({x},{y})" for x, y in line['cells'])
+            ext_str = ""
+            if line['extends']:
+                exts = ", ".join(f"({ex},{ey}) EMPTY" if val is None else f"({ex},{ey}) has value {val}"
+                                 for ex, ey, val in line['extends'])
+                ext_str = f" | {ext_label}: {exts}"
+            sym = COLOR_SYMBOLS[color]
+            analysis.append(f"  {sym} {line['length']}-in-a-row {line['direction']}: {cells_str}{ext_str}")
+            if line['length'] == 4 and four_msg:
+                analysis.append(four_msg.format(sym=sym))
+            elif line['length'] == 3 and three_msg:
+                analysis.append(three_msg)
+
+    @staticmethod
+    def _format_tactics_compact(lines: Dict, my_colors: List[str], opp_colors: List[str]) -> str:
+        """One line per sequence in the NOTATION format, e.g. "R3 DR (1,1)(2,2)(3,3) | ext (0,0)E (4,4)v5"."""
+        analysis = []
+        for label, colors, mine in (("YOUR LINES:", my_colors, True), ("OPPONENT LINES:", opp_colors, False)):
+            side = [(color, line) for color in colors for line in lines.get(color, [])]
+            if not side:
+                continue
+            analysis.append(label)
+            for color, line in sorted(side, key=lambda x: -x[1]['length']):
+                length = line['length']
+                cells = "".join(f"({x},{y})" for x, y in line['cells'])
+                text = f"{COLOR_SYMBOLS[color]}{length} {_DIRECTION_ABBR[line['direction']]} {cells}"
+                if line['extends']:
+                    text += " | ext " + " ".join(
+                        f"({ex},{ey}){'E' if val is None else f'v{val}'}" for ex, ey, val in line['extends'])
+                if length == 4:
+                    text += " << WIN: complete 5" if mine else " << BLOCK or LOSE"
+                elif length == 3 and not mine:
+                    text += " << threat"
+                analysis.append(text)
+
+        if not analysis:
+            analysis.append("No lines yet. Take the center and start a same-color sequence.")
+
+        return "\n".join(analysis)
+
+    def _format_valid_moves_compact(self, grid: Grid, hand: List[Dict]) -> str:
         """Format top valid moves for the prompt (keep it concise)."""
-        moves = self._get_valid_moves(board, hand)
+        moves = self._get_valid_moves(grid, hand)
 
         # Annotate moves with simple scores for guidance
         annotated = []
@@ -299,36 +639,30 @@ class AIPlayer:
         return f"{len(annotated)} valid moves:\n" + "\n".join(annotated)
 
     def _create_prompt(self, board: List[List], hand: List[Dict], opponent_hand_size: int) -> str:
-        board_str = self._format_board_for_ai(board)
-        hand_str = ", ".join(f"{COLOR_SYMBOLS[c['color']]}{c['value']}" for c in hand)
+        return "".join(self._create_prompt_parts(board, hand, opponent_hand_size))
 
-        if self.player_name == "claude":
-            my_colors = "RED (R) and BLUE (B)"
-            opp_colors = "GREEN (G) and YELLOW (Y)"
-        else:
-            my_colors = "GREEN (G) and YELLOW (Y)"
-            opp_colors = "RED (R) and BLUE (B)"
+    def _create_prompt_parts(self, board: List[List], hand: List[Dict], opponent_hand_size: int) -> Tuple[str, str]:
+        """Return (static_prefix, dynamic_suffix). The prefix only depends on the player,
+        so it goes first to maximize the shared prefix for provider prompt caching."""
+        grid = _encode_board(board)
+        board_str = self._format_board_for_ai(grid) if self.verbose else _format_board_compact(grid)
+        hand_str = ", ".join([CARD_LABELS[c['color']][c['value']] for c in hand])
 
         # Tactical analysis
-        tactics = self._format_tactical_analysis(board, hand)
+        tactics = self._format_tactical_analysis(grid, hand)
 
-        # Move history context
+        # Move history context (LLM-proposed cards, so look up defensively)
         history_str = ""
         if self.move_history:
             recent = self.move_history[-5:]  # Last 5 moves
-            hist_parts = []
-            for m in recent:
-                c = m.get('card', {})
-                sym = COLOR_SYMBOLS.get(c.get('color', ''), '?')
-                hist_parts.append(f"({m['x']},{m['y']}) {sym}{c.get('value', '?')}")
-            history_str = f"\nYOUR RECENT MOVES: {', '.join(hist_parts)}"
+            hist_parts = [
+                f"({m['x']},{m['y']}) {COLOR_SYMBOLS.get(m.get('card', {}).get('color', ''), '?')}"
+                f"{m.get('card', {}).get('value', '?')}"
+                for m in recent
+            ]
+            history_str = "\nYOUR RECENT MOVES: " + ", ".join(hist_parts)
 
-        prompt = f"""PUNTO GAME - Your turn as "{self.player_name}"
-
-RULES REMINDER:
-- 6x6 board. Win = 5 of SAME COLOR in a line (row/col/diagonal).
-- Your colors: {my_colors}. Opponent: {opp_colors}.
-- Play on empty cells OR capture any card with STRICTLY higher value.
+        dynamic_suffix = f"""YOUR TURN.
 
 BOARD:
 {board_str}
@@ -338,9 +672,27 @@ OPPONENT HAND SIZE: {opponent_hand_size}
 {history_str}
 
 TACTICAL ANALYSIS:
-{tactics}
+{tactics}"""
+        return self._static_prompt, dynamic_suffix
+
+    def _build_static_prompt(self) -> str:
+        """Rules, decision guide and response schema — fixed for the lifetime of the player."""
+        if self.player_name == "claude":
+            my_colors = "RED (R) and BLUE (B)"
+            opp_colors = "GREEN (G) and YELLOW (Y)"
+        else:
+            my_colors = "GREEN (G) and YELLOW (Y)"
+            opp_colors = "RED (R) and BLUE (B)"
+        notation = "" if self.verbose else _COMPACT_NOTATION
 
-DECISION GUIDE:
+        return f"""PUNTO GAME - You play as "{self.player_name}"
+
+RULES REMINDER:
+- 6x6 board. Win = 5 of SAME COLOR in a line (row/col/diagonal).
+- Your colors: {my_colors}. Opponent: {opp_colors}.
+- Play on empty cells OR capture any card with STRICTLY higher value.
+
+{notation}DECISION GUIDE:
 1. If you can complete a 5-in-a-row of your color → DO IT (instant win)
 2. If opponent has 4-in-a-row → BLOCK IT (play on their extension point)
 3. If you have 3+ in a row → extend it toward 4, then 5
@@ -348,52 +700,51 @@ DECISION GUIDE:
 5. Otherwise → build lines of your STRONGER color near center
 6. Save high cards (7-9) for captures; use low cards (1-3) for empty cells
 
-Respond with ONLY this JSON:
-{{
-  "x": <column 0-5>,
-  "y": <row 0-5>,
-  "card_value": <value from your hand>,
-  "card_color": "<color from your hand>",
-  "reasoning": "1-2 sentence strategy explanation"
-}}"""
-        return prompt
+YOUR MOVE - choose one card and cell, with these fields:
+- x: column 0-5
+- y: row 0-5
+- card_value: value of a card in your hand
+- card_color: color of that card
+- reasoning: 1-2 sentence strategy explanation
+
+"""
 
-    def _format_board_for_ai(self, board: List[List]) -> str:
-        result = "     0   1   2   3   4   5\n"
-        result += "   +---+---+---+---+---+---+\n"
+    def _format_board_for_ai(self, grid: Grid) -> str:
+        colors, values = grid
+        parts = [_BOARD_HEADER, _BOARD_SEP]
 
         for y in range(6):
-            result += f" {y} |"
-            for x in range(6):
-                cell = board[y][x]
-                if cell is None:
-                    result += " . |"
+            parts.append(f" {y} |")
+            for i in range(y * 6, y * 6 + 6):
+                code = colors[i]
+                if code:
+                    parts.append(f" {CODE_CARD_LABELS[code][values[i]]}|")
                 else:
-                    sym = COLOR_SYMBOLS.get(cell.get('color', ''), '?')
-                    result += f" {sym}{cell['value']}|"
-            result += "\n"
-            if y < 5:
-                result += "   +---+---+---+---+---+---+\n"
+                    parts.append(_EMPTY_CELL)
+            parts.append("\n")
+            parts.append(_BOARD_SEP)
 
-        result += "   +---+---+---+---+---+---+\n"
-        result += "\nR=Red, B=Blue (claude) | G=Green, Y=Yellow (openai) | .=empty"
-        return result
+        parts.append(_BOARD_LEGEND)
+        return "".join(parts)
 
-    def _parse_move(self, response_text: str, hand: List[Dict]) -> Dict:
+    def _parse_move(self, response: Union[str, Dict], hand: List[Dict]) -> Dict:
+        """Validate a move reply. Structured-output replies arrive as a dict (Claude tool input)
+        or as a bare JSON string; free-form text is still scanned for the first JSON object."""
         try:
-            response_text = re.sub(r'```json\s*', '', response_text)
-            response_text = re.sub(r'```\s*', '', response_text)
-
-            json_match = re.search(r'\{.*?\}', response_text, re.DOTALL)
+            if isinstance(response, dict):
+                raw = response
+            else:
+                response = response.replace('```json', '').replace('```', '')
 
-            if not json_match:
-                print(f"  No JSON found in response: {response_text[:300]}")
-                raise ValueError("No JSON found in response")
+                idx = response.find('{')
 
-            json_str = json_match.group()
-            print(f"  Parsing JSON: {json_str[:200]}")
+                if idx < 0:
+                    log.debug("No JSON found in response: %.300s", response)
+                    raise ValueError("No JSON found in response")
 
-            raw = json.loads(json_str)
+                # raw_decode stops at the end of the first complete object, nested braces included
+                raw, end = _DECODER.raw_decode(response, idx)
+                log.debug("Parsing JSON: %.200s", response[idx:end])
 
             # Build card dict from response
             if 'card_value' in raw and 'card_color' in raw:
@@ -414,25 +765,26 @@ Respond with ONLY this JSON:
             return move
 
         except Exception as e:
-            print(f"  Parse error: {e}")
-            print(f"Response text: {response_text[:500]}")
+            log.warning("Parse error: %s | Response text: %.500s", e, response)
             raise
 
     def _random_fallback_move(self, board: List[List], hand: List[Dict]) -> Dict:
-        import random
-
-        possible_moves = []
+        # Reservoir sampling (k=1): uniform over all playable (cell, card) pairs in one pass,
+        # without materializing the candidate list
+        chosen = None
+        n = 0
         for y in range(6):
             for x in range(6):
+                cell = board[y][x]
                 for card in hand:
-                    cell = board[y][x]
                     if cell is None or cell['value'] < card['value']:
-                        possible_moves.append({'x': x, 'y': y, 'card': card})
+                        n += 1
+                        if random.random() * n < 1:
+                            chosen = (x, y, card)
 
-        if possible_moves:
-            move = random.choice(possible_moves)
-            move['reasoning'] = "Fallback move (AI error)"
-            return move
+        if chosen:
+            x, y, card = chosen
+            return {'x': x, 'y': y, 'card': card, 'reasoning': "Fallback move (AI error)"}
 
         return {
             'x': 0,
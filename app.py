@@ -1,18 +1,30 @@
 """
 Punto AI Web Game - Flask Backend
 Human vs AI gameplay
+
+Production: gunicorn -w 1 --threads 8 -b 0.0.0.0:8000 app:app
+(one worker: games live in this process's memory; threads cover concurrent requests)
+`python app.py` runs the dev server; set FLASK_DEBUG=1 for the debugger/reloader.
 """
 
 from flask import Flask, render_template, request, jsonify, session
 from flask_cors import CORS
+import logging
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import secrets
+import threading
 
 # Import our existing game logic
-from game_logic import PuntoGame
+from game_logic import PuntoGame, PLAYER_TO_ROLE
 from ai_player import AIPlayer
+from json_provider import OrjsonProvider
+from clock import now_iso
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(message)s')
 
 # Get absolute paths
 import os
@@ -21,6 +33,8 @@ basedir = os.path.abspath(os.path.dirname(__file__))
 app = Flask(__name__,
             static_folder=os.path.join(basedir, 'static'),
             template_folder=os.path.join(basedir, 'templates'))
+app.json = OrjsonProvider(app)
+DEBUG = os.getenv('FLASK_DEBUG') == '1'
 app.secret_key = secrets.token_hex(16)
 CORS(app)
 
@@ -35,9 +49,52 @@ COSTS = {
     'o1': 1.50
 }
 
+# ai_model -> (api_type, model) for AIPlayer
+AI_MODELS = {
+    'claude-sonnet': ('claude', 'claude-sonnet-4-5-20250929'),
+    'gpt-4o': ('openai', 'gpt-4o'),
+    'claude-opus': ('claude', 'claude-opus-4-5-20251101'),
+    'o1': ('openai', 'o1'),
+}
+
+# AI turns run here so the LLM round-trip doesn't hold a request worker
+AI_MOVE_WORKERS = 8
+ai_executor = ThreadPoolExecutor(max_workers=AI_MOVE_WORKERS, thread_name_prefix='ai-move')
+
 # Daily limits
 MAX_GAMES_PER_SESSION = 20
-session_games_played = {}
+session_games_played = {}  # remote_addr -> games started today
+quota_day = datetime.now().date()
+quota_lock = threading.Lock()
+
+def _roll_quota_day():
+    """Reset all counters at midnight (call with quota_lock held)"""
+    global quota_day
+    today = datetime.now().date()
+    if today != quota_day:
+        quota_day = today
+        session_games_played.clear()
+
+def reserve_game_slot(session_id):
+    """Atomically count a new game against today's quota. Returns (allowed, games_played)."""
+    with quota_lock:
+        _roll_quota_day()
+        played = session_games_played.get(session_id, 0)
+        if played >= MAX_GAMES_PER_SESSION:
+            return False, played
+        session_games_played[session_id] = played + 1
+        return True, played + 1
+
+def release_game_slot(session_id):
+    """Give back a reserved slot when the game couldn't be created"""
+    with quota_lock:
+        if session_games_played.get(session_id, 0) > 0:
+            session_games_played[session_id] -= 1
+
+def games_played_today(session_id):
+    with quota_lock:
+        _roll_quota_day()
+        return session_games_played.get(session_id, 0)
 
 @app.route('/')
 def index():
@@ -56,35 +113,34 @@ def test():
 @app.route('/api/new_game', methods=['POST'])
 def new_game():
     """Start a new game"""
-    data = request.json
+    data = request.get_json(cache=False)
     ai_model = data.get('ai_model', 'claude-sonnet')
 
-    # Check daily limit
+    # Check daily limit (reserves the slot up front so concurrent requests can't both pass)
     session_id = request.remote_addr
-    if session_id not in session_games_played:
-        session_games_played[session_id] = 0
-
-    if session_games_played[session_id] >= MAX_GAMES_PER_SESSION:
+    allowed, games_played = reserve_game_slot(session_id)
+    if not allowed:
         return jsonify({
             'error': f'Daily limit reached ({MAX_GAMES_PER_SESSION} games)',
-            'games_played': session_games_played[session_id]
+            'games_played': games_played
         }), 429
 
     # Create new game
     game_id = secrets.token_urlsafe(16)
     game = PuntoGame()
 
-    # Initialize AI player  (AI will play as "openai" player in game logic)
-    if ai_model == 'claude-sonnet':
-        ai = AIPlayer("AI", api_type="claude", model="claude-sonnet-4-5-20250929")
-    elif ai_model == 'gpt-4o':
-        ai = AIPlayer("AI", api_type="openai", model="gpt-4o")
-    elif ai_model == 'claude-opus':
-        ai = AIPlayer("AI", api_type="claude", model="claude-opus-4-5-20251101")
-    elif ai_model == 'o1':
-        ai = AIPlayer("AI", api_type="openai", model="o1")
-    else:
+    # Initialize AI player  (AI will play as "openai" player in game logic).
+    # AIPlayer keeps per-game move history, so it's per game; its SDK/HTTP client
+    # is shared across all players of the same provider (see AIPlayer._make_client)
+    if ai_model not in AI_MODELS:
+        release_game_slot(session_id)
         return jsonify({'error': 'Invalid AI model'}), 400
+    api_type, model = AI_MODELS[ai_model]
+    try:
+        ai = AIPlayer("AI", api_type=api_type, model=model)
+    except Exception:
+        release_game_slot(session_id)
+        raise
 
     # Store game state
     # Human plays as "claude", AI plays as "openai" in game logic
@@ -92,24 +148,23 @@ def new_game():
         'game': game,
         'ai': ai,
         'ai_model': ai_model,
-        'started': datetime.now().isoformat(),
-        'cost_estimate': COSTS[ai_model]
+        'started': now_iso(),
+        'cost_estimate': COSTS[ai_model],
+        'lock': threading.Lock()  # guards the game and ai_future across request and ai-move threads
     }
 
-    session_games_played[session_id] = session_games_played.get(session_id, 0) + 1
-
     return jsonify({
         'game_id': game_id,
-        'human_cards': sorted(game.get_hand("claude"), key=lambda c: c['value'], reverse=True),
+        'human_cards': game.get_sorted_hand("claude"),
         'ai_model': ai_model,
         'cost_estimate': COSTS[ai_model],
-        'games_remaining': MAX_GAMES_PER_SESSION - session_games_played[session_id]
+        'games_remaining': MAX_GAMES_PER_SESSION - games_played
     })
 
 @app.route('/api/make_move', methods=['POST'])
 def make_move():
     """Human makes a move, then AI responds"""
-    data = request.json
+    data = request.get_json(cache=False)
     game_id = data.get('game_id')
     row = data.get('row')
     col = data.get('col')
@@ -124,8 +179,16 @@ def make_move():
         return jsonify({'error': 'Game not found'}), 404
 
     game_data = games[game_id]
+    with game_data['lock']:
+        return _play_human_move(game_data, game_id, row, col, card)
+
+def _play_human_move(game_data, game_id, row, col, card):
+    """Apply the human move and schedule the AI reply (call with the game's lock held)"""
     game = game_data['game']
-    ai = game_data['ai']
+
+    pending = game_data.get('ai_future')
+    if pending is not None and not pending.done():
+        return jsonify({'error': 'AI is still thinking'}), 409
 
     # Validate and make human move (human is "claude" player)
     is_valid, msg = game.is_valid_move(col, row, card, "claude")
@@ -139,30 +202,63 @@ def make_move():
         return jsonify({
             'status': 'game_over',
             'winner': 'human',
-            'board': format_board_for_frontend(game.board),
+            'board': frontend_board(game_data),
             'message': '🎉 You won!',
             'turns': game.current_turn
         })
 
     # Check if game over (no more moves possible)
-    human_hand = game.get_hand("claude")
-    ai_hand = game.get_hand("openai")
-
-    if not ai_hand:
+    if not game.get_hand("openai"):
         return jsonify({
             'status': 'game_over',
             'winner': 'draw',
-            'board': format_board_for_frontend(game.board),
+            'board': frontend_board(game_data),
             'message': 'Game ended in a draw'
         })
 
-    # AI's turn (AI is "openai" player)
+    # AI's turn runs in the background; the client polls /api/move_result/<game_id>
+    game_data['ai_future'] = ai_executor.submit(play_ai_turn, game_data)
+    return jsonify({
+        'status': 'ai_thinking',
+        'task_id': game_id,
+        'board': frontend_board(game_data)
+    }), 202
+
+@app.route('/api/move_result/<game_id>')
+def move_result(game_id):
+    """Poll for the AI's reply to the last human move"""
+    if game_id not in games:
+        return jsonify({'error': 'Game not found'}), 404
+
+    game_data = games[game_id]
+    with game_data['lock']:
+        future = game_data.get('ai_future')
+        if future is None:
+            return jsonify({'error': 'No AI move pending'}), 404
+        if not future.done():
+            return jsonify({'status': 'ai_thinking', 'task_id': game_id}), 202
+        game_data['ai_future'] = None
+
+    payload, status_code = future.result()
+    return jsonify(payload), status_code
+
+def play_ai_turn(game_data):
+    """Run the AI's move (AI is "openai" player). Returns (payload, status_code)."""
+    game = game_data['game']
+    ai = game_data['ai']
+    lock = game_data['lock']
+
     try:
-        board_state = game.get_board_state()
-        print(f"🤖 AI thinking... (hand: {ai_hand})")
+        # The human can't move until this future is done, so the board stays put while
+        # the AI thinks; the lock only covers reads and the move itself, not the API call
+        with lock:
+            board_state = game.get_board_state()
+            human_hand = game.get_hand("claude")
+            ai_hand = game.get_hand("openai")
+        log.debug("🤖 AI thinking... (hand: %s)", ai_hand)
 
         ai_move = ai.get_move(board_state, ai_hand, len(human_hand))
-        print(f"✅ AI move received: {ai_move}")
+        log.debug("✅ AI move received: %s", ai_move)
 
         # Extract move details
         ai_card = ai_move['card']
@@ -170,47 +266,46 @@ def make_move():
         ai_row = ai_move['y']
         ai_reasoning = ai_move.get('reasoning', 'No reasoning provided')
 
-        # Make AI move
-        game.make_move(ai_col, ai_row, ai_card, "openai")
-
-        # Check if AI won
-        if game.winner == "openai":
-            return jsonify({
-                'status': 'game_over',
-                'winner': 'ai',
-                'board': format_board_for_frontend(game.board),
+        # Make AI move (and build the reply) under the lock so game_state never sees it half-done
+        with lock:
+            game.make_move(ai_col, ai_row, ai_card, "openai")
+
+            # Check if AI won
+            if game.winner == "openai":
+                return {
+                    'status': 'game_over',
+                    'winner': 'ai',
+                    'board': frontend_board(game_data),
+                    'ai_move': {
+                        'card': ai_card,
+                        'position': [ai_row, ai_col],
+                        'reasoning': ai_reasoning,
+                        'confidence': 8
+                    },
+                    'message': f'🤖 {game_data["ai_model"]} won!',
+                    'turns': game.current_turn
+                }, 200
+
+            # Game continues
+            return {
+                'status': 'playing',
+                'board': frontend_board(game_data),
                 'ai_move': {
                     'card': ai_card,
                     'position': [ai_row, ai_col],
                     'reasoning': ai_reasoning,
                     'confidence': 8
                 },
-                'message': f'🤖 {game_data["ai_model"]} won!',
-                'turns': game.current_turn
-            })
-
-        # Game continues
-        return jsonify({
-            'status': 'playing',
-            'board': format_board_for_frontend(game.board),
-            'ai_move': {
-                'card': ai_card,
-                'position': [ai_row, ai_col],
-                'reasoning': ai_reasoning,
-                'confidence': 8
-            },
-            'human_cards': sorted(game.get_hand("claude"), key=lambda c: c['value'], reverse=True),
-            'ai_cards_count': len(game.get_hand("openai"))
-        })
+                'human_cards': game.get_sorted_hand("claude"),
+                'ai_cards_count': len(game.get_hand("openai"))
+            }, 200
 
     except Exception as e:
-        print(f"AI Error: {e}")
-        import traceback
-        traceback.print_exc()
-        return jsonify({
+        log.exception("AI Error: %s", e)
+        return {
             'error': f'AI error: {str(e)}',
             'status': 'error'
-        }), 500
+        }, 500
 
 @app.route('/api/game_state/<game_id>')
 def game_state(game_id):
@@ -219,20 +314,34 @@ def game_state(game_id):
         return jsonify({'error': 'Game not found'}), 404
 
     game_data = games[game_id]
+    with game_data['lock']:
+        return _game_state_response(game_data)
+
+def _game_state_response(game_data):
+    """Build the game_state response (call with the game's lock held)"""
     game = game_data['game']
 
-    return jsonify({
-        'board': format_board_for_frontend(game.board),
-        'human_cards': sorted(game.get_hand("claude"), key=lambda c: c['value'], reverse=True),
-        'ai_cards_count': len(game.get_hand("openai")),
-        'turn': game.current_turn
-    })
+    # State only changes on a move, so current_turn is the version; skip the
+    # encode entirely when the poller already has it
+    etag = str(game.current_turn)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify({
+            'board': frontend_board(game_data),
+            'human_cards': game.get_sorted_hand("claude"),
+            'ai_cards_count': len(game.get_hand("openai")),
+            'turn': game.current_turn
+        })
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
 
 @app.route('/api/stats')
 def stats():
     """Get usage stats"""
     session_id = request.remote_addr
-    games_played = session_games_played.get(session_id, 0)
+    games_played = games_played_today(session_id)
 
     return jsonify({
         'games_played': games_played,
@@ -240,22 +349,23 @@ def stats():
         'active_games': len(games)
     })
 
+def frontend_board(game_data):
+    """format_board_for_frontend for this game, cached until the next move"""
+    game = game_data['game']
+    cached = game_data.get('board_cache')
+    # current_turn bumps on every make_move, so it doubles as the board version
+    if cached is None or cached[0] != game.current_turn:
+        cached = (game.current_turn, format_board_for_frontend(game.board))
+        game_data['board_cache'] = cached
+    return cached[1]
+
 def format_board_for_frontend(board):
     """Convert board format for frontend"""
-    result = []
-    for row in board:
-        result_row = []
-        for cell in row:
-            if cell is None:
-                result_row.append(None)
-            else:
-                result_row.append({
-                    'card': cell['value'],
-                    'player': 'player1' if cell['player'] == 'claude' else 'player2',
-                    'color': cell['color'],
-                })
-        result.append(result_row)
-    return result
+    return [[None if cell is None else {
+                'card': cell['value'],
+                'player': PLAYER_TO_ROLE[cell['player']],
+                'color': cell['color'],
+            } for cell in row] for row in board]
 
 if __name__ == '__main__':
     print("\n" + "="*60)
@@ -266,4 +376,4 @@ if __name__ == '__main__':
     print(f"📊 Daily limit: {MAX_GAMES_PER_SESSION} games per session")
     print("\n" + "="*60 + "\n")
 
-    app.run(debug=True, host='0.0.0.0', port=8000)
+    app.run(debug=DEBUG, host='0.0.0.0', port=8000, threaded=True)
@@ -1,27 +1,49 @@
 """
 Punto AI - Multiplayer Web Game
 Real-time PvP with WebSocket, invite links, and betting hooks
+
+Production: gunicorn --worker-class eventlet -w 1 -b 0.0.0.0:8000 app_multiplayer:app
+Must run with -w 1: rooms, players and games live in process memory, and polling
+transports need sticky sessions. REDIS_URL only lets external processes emit to clients.
+`python app_multiplayer.py` runs the dev server; set FLASK_DEBUG=1 for the debugger/reloader.
 """
 
+# Green threads: must patch sockets/time before anything else imports them
+import eventlet
+eventlet.monkey_patch()
+
 from flask import Flask, render_template, request, jsonify, session
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
+import logging
 import os
+import random
+import sched
 import secrets
-from datetime import datetime
+import time
 from enum import Enum
 
-from game_logic import PuntoGame
+from game_logic import PuntoGame, ROLE_TO_PLAYER, PLAYER_TO_ROLE, OTHER_ROLE
 from ai_player import AIPlayer
+from json_provider import OrjsonProvider, SocketIOJSON
+from clock import now_iso
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(message)s')
 
 # App setup
 basedir = os.path.abspath(os.path.dirname(__file__))
 app = Flask(__name__,
             static_folder=os.path.join(basedir, 'static'),
             template_folder=os.path.join(basedir, 'templates'))
+app.json = OrjsonProvider(app)
+DEBUG = os.getenv('FLASK_DEBUG') == '1'
 app.secret_key = secrets.token_hex(16)
 CORS(app)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Optional Redis message queue so external processes can emit to clients (needs `pip install redis`)
+REDIS_URL = os.getenv('REDIS_URL')
+socketio = SocketIO(app, async_mode='eventlet', cors_allowed_origins="*", message_queue=REDIS_URL,
+                    json=SocketIOJSON)
 
 # Game modes
 class GameMode(Enum):
@@ -54,7 +76,7 @@ def index():
 @app.route('/api/create_room', methods=['POST'])
 def create_room():
     """Create a new game room"""
-    data = request.json
+    data = request.get_json(cache=False)
     mode = data.get('mode', 'pvp')
     ai_model = data.get('ai_model', None)
     wager = data.get('wager', 0) if BETTING_ENABLED else 0
@@ -67,10 +89,11 @@ def create_room():
         'ai_model': ai_model,
         'game': None,
         'players': {},
+        'players_by_name': {},  # name -> sid, for O(1) rejoin lookup
         'spectators': [],
         'wager': wager,
         'status': 'waiting',
-        'created': datetime.now().isoformat(),
+        'created': now_iso(),
         'winner': None
     }
 
@@ -97,57 +120,89 @@ def join_room_page(room_id):
 @socketio.on('connect')
 def handle_connect():
     """Player connects"""
-    print(f'✅ Player connected: {request.sid}')
+    log.info('✅ Player connected: %s', request.sid)
     emit('connected', {'sid': request.sid})
 
+# Disconnect grace period: one scheduler drained by a single background task,
+# instead of a sleeping thread per disconnect. sid -> pending sched event.
+DISCONNECT_GRACE_SECONDS = 30
+cleanup_scheduler = sched.scheduler(time.monotonic, socketio.sleep)
+pending_cleanups = {}
+_cleanup_task_started = False
+
+def _run_cleanup_scheduler():
+    """Drain due cleanups forever; sched.run returns once the queue is empty."""
+    while True:
+        cleanup_scheduler.run()
+        socketio.sleep(1)
+
+def schedule_disconnect_cleanup(sid, room_id):
+    """Remove sid from room_id after the grace period unless it rejoins first"""
+    global _cleanup_task_started
+    if not _cleanup_task_started:
+        _cleanup_task_started = True
+        socketio.start_background_task(_run_cleanup_scheduler)
+    cancel_disconnect_cleanup(sid)
+    pending_cleanups[sid] = cleanup_scheduler.enter(
+        DISCONNECT_GRACE_SECONDS, 1, disconnect_cleanup, (sid, room_id))
+
+def cancel_disconnect_cleanup(sid):
+    """Drop a pending cleanup (player rejoined)"""
+    event = pending_cleanups.pop(sid, None)
+    if event is not None:
+        try:
+            cleanup_scheduler.cancel(event)
+        except ValueError:
+            pass  # already ran
+
+def disconnect_cleanup(sid, room_id):
+    """Grace period expired: remove the player and delete the room if empty"""
+    pending_cleanups.pop(sid, None)
+    room = rooms.get(room_id)
+    # Still same old SID = no rejoin happened
+    if room is None or sid not in room['players']:
+        return
+    player_name = room['players'][sid]['name']
+    log.info('   ⏰ Grace period expired for %s, removing from room', player_name)
+    del room['players'][sid]
+    if room['players_by_name'].get(player_name) == sid:
+        del room['players_by_name'][player_name]
+    if sid in players:
+        del players[sid]
+
+    # Delete empty rooms
+    if len(room['players']) == 0:
+        log.info('   🗑️  Deleting empty room %s', room_id)
+        if room_id in rooms:
+            del rooms[room_id]
+
 @socketio.on('disconnect')
 def handle_disconnect():
     """Player disconnects"""
     sid = request.sid
-    print(f'⚠️  Player disconnected: {sid}')
+    log.info('⚠️  Player disconnected: %s', sid)
 
     # Find room but DON'T delete immediately (allow rejoin)
-    for room_id, room in list(rooms.items()):
-        if sid in room['players']:
-            player_name = room['players'][sid]['name']
-            print(f'   Player: {player_name} in room {room_id}')
-            print(f'   🔄 Keeping player data for potential rejoin (30s grace period)')
-
-            # Notify other players
-            socketio.emit('player_disconnected', {
-                'name': player_name,
-                'message': f'{player_name} disconnected. Waiting for reconnect...'
-            }, room=room_id)
-
-            # Schedule cleanup after 30 seconds if no rejoin
-            def delayed_cleanup():
-                import time
-                time.sleep(30)
-                # Check if player rejoined
-                if sid in room['players']:
-                    # Still same old SID = no rejoin happened
-                    print(f'   ⏰ Grace period expired for {player_name}, removing from room')
-                    if sid in room['players']:
-                        del room['players'][sid]
-                    if sid in players:
-                        del players[sid]
-
-                    # Delete empty rooms
-                    if len(room['players']) == 0:
-                        print(f'   🗑️  Deleting empty room {room_id}')
-                        if room_id in rooms:
-                            del rooms[room_id]
-
-            # Run cleanup in background
-            from threading import Thread
-            Thread(target=delayed_cleanup, daemon=True).start()
-            break
+    room_id = players.get(sid, {}).get('room_id')
+    room = rooms.get(room_id)
+    if room is not None and sid in room['players']:
+        player_name = room['players'][sid]['name']
+        log.info('   Player: %s in room %s', player_name, room_id)
+        log.debug('   🔄 Keeping player data for potential rejoin (30s grace period)')
+
+        # Notify other players
+        socketio.emit('player_disconnected', {
+            'name': player_name,
+            'message': f'{player_name} disconnected. Waiting for reconnect...'
+        }, room=room_id)
+
+        # Schedule cleanup after 30 seconds if no rejoin
+        schedule_disconnect_cleanup(sid, room_id)
 
 @socketio.on('join_room')
 def handle_join_room(data):
     """Player joins a game room"""
-    print(f"\n👤 Player joining room...")
-    print(f"   Data: {data}")
+    log.debug("👤 Player joining room... Data: %s", data)
 
     room_id = data['room_id']
     player_name = data.get('name', f'Player{secrets.token_hex(2)}')
@@ -160,20 +215,17 @@ def handle_join_room(data):
     room = rooms[room_id]
 
     # CHECK FOR REJOIN: Player with same name already in room?
-    existing_player = None
-    old_sid = None
-    for pid, pdata in room['players'].items():
-        if pdata['name'] == player_name:
-            existing_player = pdata
-            old_sid = pid
-            print(f"   🔄 REJOIN detected: {player_name} (old_sid={old_sid}, new_sid={sid})")
-            break
+    old_sid = room['players_by_name'].get(player_name)
+    existing_player = room['players'].get(old_sid)
+    if existing_player:
+        log.info("   🔄 REJOIN detected: %s (old_sid=%s, new_sid=%s)", player_name, old_sid, sid)
 
     if existing_player:
         # REJOIN: Update socket ID, restore state
         player_role = existing_player['role']
 
         # Remove old socket ID entry
+        cancel_disconnect_cleanup(old_sid)
         if old_sid in room['players']:
             del room['players'][old_sid]
         if old_sid in players:
@@ -185,6 +237,7 @@ def handle_join_room(data):
             'name': player_name,
             'role': player_role
         }
+        room['players_by_name'][player_name] = sid
 
         players[sid] = {
             'room_id': room_id,
@@ -194,7 +247,7 @@ def handle_join_room(data):
 
         join_room(room_id)
 
-        print(f"   ✅ Player rejoined as {player_role}")
+        log.info("   ✅ Player rejoined as %s", player_role)
 
         # Send current game state
         if room['game']:
@@ -202,14 +255,14 @@ def handle_join_room(data):
             current_state = {
                 'status': room['status'],
                 'board': format_board(game.board),
-                'player1_cards': sorted(game.hand_claude, reverse=True),
-                'player2_cards': sorted(game.hand_openai, reverse=True),
+                'player1_cards': game.get_sorted_hand("claude"),
+                'player2_cards': game.get_sorted_hand("openai"),
                 'your_role': player_role,
-                'your_cards': sorted(game.hand_claude if player_role == 'player1' else game.hand_openai, reverse=True),
+                'your_cards': game.get_sorted_hand(ROLE_TO_PLAYER[player_role]),
                 'current_turn': room.get('current_turn', 'player1')
             }
             emit('game_state_restored', current_state)
-            print(f"   📤 Game state sent to rejoined player")
+            log.debug("   📤 Game state sent to rejoined player")
 
         return
 
@@ -228,6 +281,7 @@ def handle_join_room(data):
         'name': player_name,
         'role': player_role
     }
+    room['players_by_name'][player_name] = sid
 
     players[sid] = {
         'room_id': room_id,
@@ -235,7 +289,7 @@ def handle_join_room(data):
         'role': player_role
     }
 
-    print(f"   ✅ New player joined as {player_role}")
+    log.info("   ✅ New player joined as %s", player_role)
 
     # Notify room
     socketio.emit('player_joined', {
@@ -250,8 +304,6 @@ def handle_join_room(data):
 
 def start_game(room_id):
     """Initialize and start game"""
-    import random
-
     room = rooms[room_id]
     room['game'] = PuntoGame()
     room['status'] = 'playing'
@@ -261,7 +313,7 @@ def start_game(room_id):
 
     # 🎲 RANDOMIZE who starts!
     first_player = random.choice(['player1', 'player2'])
-    print(f"🎲 Coin flip: {first_player} starts first!")
+    log.info("🎲 Coin flip: %s starts first!", first_player)
 
     # Track current turn in room
     room['current_turn'] = first_player
@@ -271,11 +323,11 @@ def start_game(room_id):
         'board': format_board(room['game'].board),
         'player1': {
             'name': player_list[0]['name'],
-            'cards': sorted(room['game'].hand_claude, reverse=True)
+            'cards': room['game'].get_sorted_hand("claude")
         },
         'player2': {
             'name': player_list[1]['name'],
-            'cards': sorted(room['game'].hand_openai, reverse=True)
+            'cards': room['game'].get_sorted_hand("openai")
         },
         'current_turn': first_player,  # 🎲 Random!
         'wager': room['wager']
@@ -288,19 +340,17 @@ def handle_make_move(data):
     """Player makes a move"""
     try:
         sid = request.sid
-        print(f"\n📥 Received move from {sid}")
-        print(f"   Data: {data}")
+        log.debug("📥 Received move from %s: %s", sid, data)
 
         if sid not in players:
-            print(f"❌ Player {sid} not in players dict")
+            log.warning("❌ Player %s not in players dict", sid)
             emit('error', {'message': 'Not in a game'})
             return
 
         room_id = players[sid]['room_id']
-        print(f"   Room: {room_id}")
 
         if room_id not in rooms:
-            print(f"❌ Room {room_id} not found")
+            log.warning("❌ Room %s not found", room_id)
             emit('error', {'message': 'Room not found'})
             return
 
@@ -308,7 +358,7 @@ def handle_make_move(data):
         game = room['game']
 
         if not game:
-            print(f"❌ No game in room {room_id}")
+            log.warning("❌ No game in room %s", room_id)
             emit('error', {'message': 'Game not initialized'})
             return
 
@@ -318,75 +368,67 @@ def handle_make_move(data):
 
         # Determine player
         player_role = players[sid]['role']
-        game_player = 'claude' if player_role == 'player1' else 'openai'
+        game_player = ROLE_TO_PLAYER[player_role]
 
-        print(f"   Player: {player_role} ({game_player})")
-        print(f"   Move: card={card} pos=({row},{col})")
+        log.debug("   Room %s, player %s (%s), move: card=%s pos=(%s,%s)",
+                  room_id, player_role, game_player, card, row, col)
 
         # Validate move
         is_valid, msg = game.is_valid_move(col, row, card, game_player)
-        print(f"   Valid: {is_valid} - {msg}")
+        log.debug("   Valid: %s - %s", is_valid, msg)
 
         if not is_valid:
             emit('error', {'message': f'Invalid move: {msg}'})
             return
 
     except Exception as e:
-        print(f"❌ ERROR in handle_make_move: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("❌ ERROR in handle_make_move: %s", e)
         emit('error', {'message': f'Server error: {str(e)}'})
         return
 
     try:
         # Make move
-        print(f"   Making move...")
         game.make_move(col, row, card, game_player)
-        print(f"   ✅ Move executed")
 
-        # DEBUG: Print board state
-        print(f"\n🎮 Move made by {player_role}: card={card} pos=({row},{col})")
-        print(f"   Player: {game_player}")
-        print(f"   Game winner: {game.winner}")
-        print(f"   Turn count: {game.current_turn}")
-        print("\n   Current board:")
-        print(game.format_board())
+        log.debug("🎮 Move made by %s (%s): card=%s pos=(%s,%s) winner=%s turn=%s",
+                  player_role, game_player, card, row, col, game.winner, game.current_turn)
+        # format_board builds a multi-line string, so only pay for it when it'll be shown
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("   Current board:%s", game.format_board())
 
         # Check winner
         winner = None
         if game.winner:
-            winner = 'player1' if game.winner == 'claude' else 'player2'
+            winner = PLAYER_TO_ROLE[game.winner]
             room['status'] = 'finished'
             room['winner'] = winner
-            print(f"🏆 WINNER DETECTED: {winner} (game.winner={game.winner})")
+            log.info("🏆 WINNER DETECTED: %s (game.winner=%s)", winner, game.winner)
 
         # Update current turn in room state
-        next_turn = 'player2' if player_role == 'player1' else 'player1'
+        next_turn = OTHER_ROLE[player_role]
         room['current_turn'] = next_turn
 
-        # Broadcast move
+        # Broadcast move: only the changed cell; clients keep their own board
+        # (full board still goes out on game_start / game_state_restored)
         move_data = {
             'player': player_role,
             'card': card,
             'position': [row, col],
-            'board': format_board(game.board),
-            'player1_cards': sorted(game.hand_claude, reverse=True),
-            'player2_cards': sorted(game.hand_openai, reverse=True),
+            'placed': format_cell(game.board[row][col]),
+            'player1_cards': game.get_sorted_hand("claude"),
+            'player2_cards': game.get_sorted_hand("openai"),
             'winner': winner,
             'next_turn': next_turn
         }
 
-        print(f"   📤 Broadcasting move to room {room_id}")
         socketio.emit('move_made', move_data, room=room_id)
-        print(f"   ✅ Move broadcasted")
+        log.debug("   📤 Move broadcast to room %s", room_id)
 
         if winner:
             handle_game_end(room_id, winner)
 
     except Exception as e:
-        print(f"❌ ERROR executing move: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("❌ ERROR executing move: %s", e)
         emit('error', {'message': f'Error executing move: {str(e)}'})
 
 def handle_game_end(room_id, winner):
@@ -423,19 +465,16 @@ def handle_rematch(data):
 
 def format_board(board):
     """Format board for frontend"""
-    result = []
-    for row in board:
-        result_row = []
-        for cell in row:
-            if cell is None:
-                result_row.append(None)
-            else:
-                result_row.append({
-                    'card': cell['value'],
-                    'player': 'player1' if cell['player'] == 'claude' else 'player2'
-                })
-        result.append(result_row)
-    return result
+    return [[None if cell is None else {
+                'card': cell['value'],
+                'player': PLAYER_TO_ROLE[cell['player']]
+            } for cell in row] for row in board]
+
+def format_cell(cell):
+    """Format a single board cell the same way format_board does"""
+    if cell is None:
+        return None
+    return {'card': cell['value'], 'player': PLAYER_TO_ROLE[cell['player']]}
 
 @app.route('/api/rooms')
 def list_rooms():
@@ -451,7 +490,11 @@ def list_rooms():
         for r in rooms.values()
         if r['status'] == 'waiting'
     ]
-    return jsonify({'rooms': active_rooms})
+    # Rooms have no version counter, so tag the body; unchanged polls get a 304 and no body
+    response = jsonify({'rooms': active_rooms})
+    response.add_etag()
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
 
 # ============================================================================
 # MAIN
@@ -467,4 +510,4 @@ if __name__ == '__main__':
     print(f"💰 Betting: {'ENABLED' if BETTING_ENABLED else 'DISABLED (hook ready)'}")
     print("\n" + "="*60 + "\n")
 
-    socketio.run(app, host='127.0.0.1', port=8000, debug=True)
+    socketio.run(app, host='127.0.0.1', port=8000, debug=DEBUG)
@@ -1,33 +1,67 @@
 """
 Punto AI - Multiplayer with Blockchain Wagering
 Extended version with on-chain betting
+
+Production: gunicorn --worker-class eventlet -w 1 --bind 0.0.0.0:$PORT app_wagering:app
+Must run with -w 1 (see Procfile): rooms, players and games live in process memory, and polling
+transports need sticky sessions. REDIS_URL only lets external processes emit to clients.
+`python app_wagering.py` runs the dev server; set FLASK_DEBUG=1 for the debugger/reloader.
 """
 
+# Green threads: must patch sockets/time before anything else imports them
+import eventlet
+eventlet.monkey_patch()
+from eventlet import tpool
+
 from dotenv import load_dotenv
 load_dotenv()
 
 from flask import Flask, render_template, request, jsonify
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
+import logging
 import os
 import secrets
 import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass
 from datetime import datetime, timezone
 from enum import Enum
+import heapq
 import random
 import time
 
-from game_logic import PuntoGame
-from hackathon_matches import heuristic_move, valid_moves as hm_valid_moves, MatchAgent
+from game_logic import PuntoGame, ROLE_TO_PLAYER, PLAYER_TO_ROLE, OTHER_ROLE
+from hackathon_matches import (
+    heuristic_move, valid_moves as hm_valid_moves, MatchAgent, resolve_tiebreak, send_tx, contract,
+    created_game_id, tx_params,
+)
+from web3 import Web3
+from eth_account import Account
 from blockchain.wagering import get_blockchain
 import evidence_logger
 import elo
+import wallet_elo
+from json_provider import OrjsonProvider, SocketIOJSON
+from clock import now_iso
+
+log = logging.getLogger(__name__)
+logging.basicConfig(level=os.getenv('LOG_LEVEL', 'INFO').upper(), format='%(message)s')
 
 # App setup
 basedir = os.path.abspath(os.path.dirname(__file__))
 app = Flask(__name__,
             static_folder=os.path.join(basedir, 'static'),
             template_folder=os.path.join(basedir, 'templates'))
+app.json = OrjsonProvider(app)
+# Behind a reverse proxy (the Dockerfile sets PROXY_HOPS=1 for Railway's edge) take the client
+# address from X-Forwarded-For, so per-client limits don't all land on the proxy's address.
+# Leave it 0 when clients connect directly, or they could spoof the header.
+PROXY_HOPS = int(os.getenv('PROXY_HOPS', '0'))
+if PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS)
+DEBUG = os.getenv('FLASK_DEBUG') == '1'
 app.secret_key = secrets.token_hex(16)
 CORS(app)
 ALLOWED_ORIGINS = [
@@ -37,21 +71,84 @@ ALLOWED_ORIGINS = [
     "https://puntoarena.xyz",
     "https://www.puntoarena.xyz",
 ]
-socketio = SocketIO(app, cors_allowed_origins=ALLOWED_ORIGINS)
+# Optional Redis message queue so external processes can emit to clients (needs `pip install redis`)
+REDIS_URL = os.getenv('REDIS_URL')
+socketio = SocketIO(app, async_mode='eventlet', cors_allowed_origins=ALLOWED_ORIGINS, message_queue=REDIS_URL,
+                    json=SocketIOJSON)
 
 # Initialize blockchain
 try:
     blockchain = get_blockchain()
     WAGERING_ENABLED = True
-    print("✅ Wagering ENABLED")
+    log.info("✅ Wagering ENABLED")
 except Exception as e:
-    print(f"⚠️  Wagering DISABLED: {e}")
+    log.warning("⚠️  Wagering DISABLED: %s", e)
     WAGERING_ENABLED = False
 
 # Game rooms storage
 rooms = {}
 players = {}
-last_move_time = {}  # sid -> timestamp for rate limiting
+last_move_time = {}  # sid -> time.monotonic() of last accepted move, for rate limiting
+
+@dataclass(slots=True)
+class PlayerSlot:
+    """A seated player in rooms[room_id]['players'] (slotted: no per-instance dict)"""
+    sid: str
+    name: str
+    role: str
+    address: str = ''
+    connected: bool = True
+
+
+@dataclass(slots=True)
+class TokenBucket:
+    """Refill-on-read token bucket: O(1) per check, no timestamp history"""
+    tokens: float
+    last: float
+
+
+# Finished arena rooms leave `rooms` and are kept here, oldest evicted first,
+# so spectators can still load recent results without rooms growing forever
+FINISHED_ARENA_CAP = 64
+finished_arena_rooms = OrderedDict()
+# /api/arena/active listing, updated on state transitions instead of rebuilt per poll
+arena_live = {}  # room_id -> summary of a starting/playing arena match
+arena_recent = deque(maxlen=20)  # finished summaries, newest first
+ARENA_STALE_SECONDS = 180  # an arena match without a result after this long is timed out
+arena_expiry = []  # heap of (time.monotonic() deadline, room_id), one entry per arena room
+MIN_MOVE_INTERVAL = 0.5  # seconds
+# Spectator pacing between arena moves; a green-thread sleep, so it holds no OS thread.
+# Set ARENA_MOVE_DELAY=0 for headless/batch runs.
+ARENA_MOVE_DELAY = float(os.getenv('ARENA_MOVE_DELAY', '1.2'))
+# /api/arena/start token bucket per client address: bursts of ARENA_START_BURST,
+# refilling ARENA_START_RATE tokens per second
+ARENA_START_BURST = 3
+ARENA_START_RATE = 1 / 20
+# A bucket idle this long has refilled completely, so dropping it changes nothing
+ARENA_BUCKET_IDLE = ARENA_START_BURST / ARENA_START_RATE
+arena_start_buckets = {}  # remote address -> TokenBucket
+arena_buckets_swept = 0.0  # monotonic time of the last idle-bucket sweep
+
+# Environment config, read once at import instead of per request/match
+CONTRACT_ADDRESS = os.getenv('CONTRACT_ADDRESS', '')
+DEFAULT_AGENT1_ENGINE = os.getenv('AGENT1_ENGINE', 'heuristic')
+DEFAULT_AGENT2_ENGINE = os.getenv('AGENT2_ENGINE', 'heuristic')
+DEFAULT_MATCH_WAGER = os.getenv('MATCH_WAGER_MON', '0.01')
+
+
+def load_arena_wallet(private_key):
+    """Derive the arena wallet account once at import (secp256k1 work), None if unset or invalid."""
+    if not private_key:
+        return None
+    try:
+        return Account.from_key(private_key)
+    except Exception as e:
+        log.warning("⚠️  Invalid arena wallet key: %s", e)
+        return None
+
+
+ARENA_WALLET1 = load_arena_wallet(os.getenv("WALLET1_PRIVATE_KEY") or os.getenv("ORACLE_PRIVATE_KEY"))
+ARENA_WALLET2 = load_arena_wallet(os.getenv("WALLET2_PRIVATE_KEY"))
 
 # ============================================================================
 # ROUTES
@@ -75,11 +172,8 @@ def join_room_page(room_id):
 @app.route('/api/create_wagered_room', methods=['POST'])
 def create_wagered_room():
     """Create room with on-chain wager"""
-    print(f"\n{'='*60}")
-    print(f"🎰 Creating wagered room...")
-    data = request.json
+    data = request.get_json(cache=False)
     wager_amount = data.get('wager', 0)  # in MON
-    print(f"   Wager: {wager_amount} MON")
 
     room_id = secrets.token_urlsafe(8)
 
@@ -90,16 +184,15 @@ def create_wagered_room():
         'players': {},
         'wager': wager_amount,
         'status': 'waiting',
-        'created': datetime.now().isoformat(),
+        'created': now_iso(),
         'winner': None,
         'blockchain_game_id': None  # Will be set when player1 creates on-chain
     }
 
     invite_link = f"{request.host_url.rstrip('/')}/join/{room_id}"
 
-    print(f"✅ Room created: {room_id}")
-    print(f"   Invite: {invite_link}")
-    print(f"{'='*60}\n")
+    log.info("🎰 Wagered room created: %s (wager %s MON)", room_id, wager_amount)
+    log.debug("   Invite: %s", invite_link)
 
     return jsonify({
         'room_id': room_id,
@@ -134,7 +227,6 @@ def api_leaderboard():
 @app.route('/api/wallet-rankings')
 def api_wallet_rankings():
     """JSON endpoint for wallet-based player rankings"""
-    import wallet_elo
     rankings = wallet_elo.get_wallet_rankings()
     return jsonify(rankings)
 
@@ -156,41 +248,16 @@ def arena_page():
 @app.route('/api/arena/active')
 def active_arena_matches():
     """List active and recent arena matches for spectators"""
-    matches = []
-    for rid, room in rooms.items():
-        if room.get('mode') != 'arena':
-            continue
-        status = room.get('status', 'unknown')
-        info = room.get('arena_match_info', {})
-        result = room.get('arena_result')
-        matches.append({
-            'room_id': rid,
-            'status': 'finished' if result else ('playing' if room.get('arena_game') else 'starting'),
-            'engine1': info.get('agent1', {}).get('engine', room.get('arena_config', {}).get('engine1', '?')),
-            'engine2': info.get('agent2', {}).get('engine', room.get('arena_config', {}).get('engine2', '?')),
-            'winner': result.get('winner') if result else None,
-            'created': room.get('created', ''),
-        })
-    # Sort: playing first, then starting, then finished (most recent first)
-    order = {'playing': 0, 'starting': 1, 'finished': 2}
-    matches.sort(key=lambda m: (order.get(m['status'], 9), m.get('created', '')), reverse=False)
-    # For finished, reverse by created so newest first
-    playing = [m for m in matches if m['status'] in ('playing', 'starting')]
-    finished = [m for m in matches if m['status'] == 'finished']
-    finished.sort(key=lambda m: m.get('created', ''), reverse=True)
-    return jsonify(playing + finished[:20])  # Cap at 20 finished
-
+    # Playing before starting (stable, so each group stays in creation order), then newest finished
+    live = sorted(arena_live.values(), key=lambda m: m['status'] != 'playing')
+    return jsonify(live + list(arena_recent))
 
-@app.route('/api/arena/start', methods=['POST'])
-def start_arena_match():
-    """Start an AI vs AI match with spectator broadcasting"""
-    data = request.json or {}
-    engine1 = data.get('engine1', os.getenv('AGENT1_ENGINE', 'heuristic'))
-    engine2 = data.get('engine2', os.getenv('AGENT2_ENGINE', 'heuristic'))
-    wager = float(data.get('wager', os.getenv('MATCH_WAGER_MON', '0.01')))
-
-    room_id = f"arena_{secrets.token_hex(4)}"
 
+def new_arena_room(room_id, engine1, engine2, wager, on_chain=False):
+    """Create an arena room plus its /api/arena/active summary.
+    match_info starts as a placeholder (built like run_arena_match's, so off-chain
+    matches show no wager) so spectators joining before run_arena_match stores the
+    real one get a prebuilt dict rather than one assembled per join."""
     rooms[room_id] = {
         'id': room_id,
         'mode': 'arena',
@@ -198,23 +265,62 @@ def start_arena_match():
         'players': {},
         'wager': wager,
         'status': 'arena_pending',
-        'created': datetime.now().isoformat(),
+        'created': now_iso(),
+        'created_at': time.monotonic(),  # 'created' is for display
         'winner': None,
         'blockchain_game_id': None,
         'arena_config': {'engine1': engine1, 'engine2': engine2},
+        'spectator_ready': threading.Event(),  # green under monkey_patch; set by join_spectate
+        'arena_match_info': {
+            'agent1': {'engine': engine1, 'address': ''},
+            'agent2': {'engine': engine2, 'address': ''},
+            'wager': wager if on_chain else 0,
+            'room_id': room_id,
+            'game_id': None,
+        },
+    }
+    heapq.heappush(arena_expiry, (rooms[room_id]['created_at'] + ARENA_STALE_SECONDS, room_id))
+    arena_live[room_id] = {
+        'room_id': room_id,
+        'status': 'starting',
+        'engine1': engine1,
+        'engine2': engine2,
+        'winner': None,
+        'created': rooms[room_id]['created'],
     }
 
-    # Launch arena match in background thread
-    thread = threading.Thread(
-        target=run_arena_match,
-        args=(room_id, engine1, engine2, wager, data.get('on_chain', False)),
-        daemon=True,
-    )
-    thread.start()
+
+def finish_arena_summary(room_id, winner):
+    """Move an arena room's summary from the live listing to the recent results."""
+    summary = arena_live.pop(room_id, None)
+    if summary is not None:
+        summary['status'] = 'finished'
+        summary['winner'] = winner
+        arena_recent.appendleft(summary)
+
+
+@app.route('/api/arena/start', methods=['POST'])
+def start_arena_match():
+    """Start an AI vs AI match with spectator broadcasting"""
+    if not take_arena_start_token(request.remote_addr):
+        return jsonify({'error': 'Too many arena matches started, try again shortly'}), 429
+
+    data = request.get_json(cache=False) or {}
+    engine1 = data.get('engine1', DEFAULT_AGENT1_ENGINE)
+    engine2 = data.get('engine2', DEFAULT_AGENT2_ENGINE)
+    wager = float(data.get('wager', DEFAULT_MATCH_WAGER))
+
+    room_id = f"arena_{secrets.token_hex(4)}"
+
+    on_chain = data.get('on_chain', False)
+    new_arena_room(room_id, engine1, engine2, wager, on_chain)
+
+    # Launch arena match as a green thread (its waits and RPC calls yield instead of pinning an OS thread)
+    socketio.start_background_task(run_arena_match, room_id, engine1, engine2, wager, on_chain)
 
     spectator_url = f"{request.host_url.rstrip('/')}/spectate/{room_id}"
-    print(f"🏟️ Arena match started: {room_id}")
-    print(f"   Spectate: {spectator_url}")
+    log.info("🏟️ Arena match started: %s", room_id)
+    log.debug("   Spectate: %s", spectator_url)
 
     return jsonify({
         'room_id': room_id,
@@ -226,11 +332,24 @@ def start_arena_match():
 
 
 def run_arena_match(room_id, engine1, engine2, wager_mon, on_chain=False):
-    """Background thread: run an AI vs AI match with live Socket.IO broadcasts.
+    """Background task: run an AI vs AI match with live Socket.IO broadcasts.
     on_chain=True for official hackathon matches, False for background show matches.
+    The room is retired however the match ends, so a failed match can't pin its game in rooms.
     """
-    from hackathon_matches import MatchAgent, valid_moves as hm_vm
+    try:
+        play_arena_match(room_id, engine1, engine2, wager_mon, on_chain)
+    except Exception as e:
+        log.exception("❌ Arena match %s failed: %s", room_id, e)
+        room = rooms.get(room_id)
+        if room is not None and not room.get('arena_result'):
+            room['arena_result'] = {'winner': None, 'reason': 'error'}
+    finally:
+        finish_arena_summary(room_id, None)  # no-op unless the match died before its result
+        retire_arena_room(room_id)
+
 
+def play_arena_match(room_id, engine1, engine2, wager_mon, on_chain):
+    """Play the arena match itself; run_arena_match handles failure and teardown."""
     agent1 = MatchAgent("agent1", "claude", engine1)
     agent2 = MatchAgent("agent2", "openai", engine2)
 
@@ -251,108 +370,105 @@ def run_arena_match(room_id, engine1, engine2, wager_mon, on_chain=False):
     # On-chain setup (only for official matches)
     if on_chain:
         try:
-            from hackathon_matches import send_tx, contract, w3
-            from web3 import Web3
-            from eth_account import Account
-
-            wallet1_key = os.getenv("WALLET1_PRIVATE_KEY") or os.getenv("ORACLE_PRIVATE_KEY")
-            wallet2_key = os.getenv("WALLET2_PRIVATE_KEY")
-            if wallet1_key and wallet2_key and contract:
-                wallet1 = Account.from_key(wallet1_key)
-                wallet2 = Account.from_key(wallet2_key)
+            wallet1 = ARENA_WALLET1
+            wallet2 = ARENA_WALLET2
+            if wallet1 and wallet2 and contract:
                 match_info['agent1']['address'] = wallet1.address
                 match_info['agent2']['address'] = wallet2.address
 
                 hm_room_id = f"arena_{room_id}_{int(time.time())}"
                 wager_wei = Web3.to_wei(wager_mon, "ether")
 
+                # joinGame needs createGame's game ID, so the txs stay serial, but wallet2's
+                # nonce/gas price lookups run while the create receipt is awaited
+                join_params = eventlet.spawn(tx_params, wallet2)
                 receipt = send_tx(wallet1, contract.functions.createGame(hm_room_id), wager_wei)
                 tx_create = receipt.transactionHash.hex()
-                game_id = contract.functions.gameCounter().call()
-                print(f"   🏟️ Arena game created: ID={game_id}, TX={tx_create[:20]}...")
+                game_id = created_game_id(receipt)
+                log.info("🏟️ Arena game created: ID=%s, TX=%.20s...", game_id, tx_create)
 
-                receipt = send_tx(wallet2, contract.functions.joinGame(game_id), wager_wei)
+                receipt = send_tx(wallet2, contract.functions.joinGame(game_id), wager_wei, join_params.wait())
                 tx_join = receipt.transactionHash.hex()
-                print(f"   🏟️ Arena game joined: TX={tx_join[:20]}...")
+                log.info("🏟️ Arena game joined: TX=%.20s...", tx_join)
                 match_info['game_id'] = game_id
         except Exception as e:
-            print(f"   ⚠️ Arena chain ops failed: {e}")
+            log.warning("⚠️ Arena chain ops failed: %s", e)
 
     rooms[room_id]['arena_match_info'] = match_info
     socketio.emit('match_info', match_info, room=room_id)
 
-    # Brief wait for spectator (3s max)
-    for _ in range(6):
-        if rooms.get(room_id, {}).get('spectator_connected'):
-            print(f"   👁️ Spectator connected to {room_id}!")
-            break
-        time.sleep(0.5)
+    # Brief wait for spectator (3s max), woken as soon as one joins
+    if rooms[room_id]['spectator_ready'].wait(timeout=3):
+        log.debug("👁️ Spectator connected to %s!", room_id)
 
     socketio.emit('match_info', match_info, room=room_id)
 
     # Step 2: Play game move-by-move with broadcasts
     game = PuntoGame()
-    rooms[room_id]['arena_game'] = game  # Store for late-joining spectators
+    room = rooms[room_id]
+    room['arena_game'] = game  # Store for late-joining spectators
+    if room_id in arena_live:
+        arena_live[room_id]['status'] = 'playing'
+    # side -> (agent, player number, other side): one lookup per turn instead of repeated compares
+    seats = {"claude": (agent1, 1, "openai"), "openai": (agent2, 2, "claude")}
     start_side = random.choice(["claude", "openai"])
     current = start_side
     turns = 0
     max_turns = 200
 
-    current_player_num = 1 if current == "claude" else 2
-    rooms[room_id]['arena_current_player'] = current_player_num
+    current_player_num = seats[current][1]
+    room['arena_current_player'] = current_player_num
 
     # Broadcast game_start
-    board_state = format_board(game.board)
+    board_state = room_board(room, game)
     socketio.emit('game_start', {
         'board': board_state,
         'current_player': current_player_num,
         'hands': {1: len(game.hand_claude), 2: len(game.hand_openai)},
     }, room=room_id)
 
-    time.sleep(1.5)
+    socketio.sleep(1.5)
 
     winner_side = None
     reason = None
 
     while turns < max_turns and not game.is_game_over():
-        agent = agent1 if current == "claude" else agent2
-        player_num = 1 if current == "claude" else 2
+        agent, player_num, next_side = seats[current]
 
-        hand = game.get_hand(current)
-        if not hand:
-            other = "openai" if current == "claude" else "claude"
-            current = other
+        if not game.get_hand(current):
+            current = next_side
             if not game.get_hand(current):
                 break
             continue
 
-        move = agent.choose_move(game)
+        move = agent_move(agent, game)
         is_valid, _ = game.is_valid_move(move["x"], move["y"], move["card"], current)
         if not is_valid:
-            from hackathon_matches import valid_moves as hm_valid_moves
             fallback = hm_valid_moves(game, current)
             if not fallback:
-                current = "openai" if current == "claude" else "claude"
+                current = next_side
                 continue
             move = fallback[0]
 
         game.make_move(move["x"], move["y"], move["card"], current)
         turns += 1
 
-        next_side = "openai" if current == "claude" else "claude"
-        next_player = 1 if next_side == "claude" else 2
-        rooms[room_id]['arena_current_player'] = next_player
+        next_player = seats[next_side][1]
+        room['arena_current_player'] = next_player
+        room['board_seq'] = turns
 
-        # Broadcast move to spectators
+        # Broadcast move to spectators: just the placed cell, clients patch their board
+        # (full board goes out in game_start, including for late joiners). A room emit
+        # without a callback is encoded once and the same packet goes to every spectator.
         socketio.emit('spectator_move', {
             'row': move["y"],
             'col': move["x"],
             'card_value': move["card"]["value"],
             'card_color': move["card"]["color"],
             'player': player_num,
-            'board': format_board(game.board),
             'current_player': next_player,
             'hands': {1: len(game.hand_claude), 2: len(game.hand_openai)},
+            'board_seq': turns,  # lets a client that missed a move ask for a fresh snapshot
         }, room=room_id)
 
         if game.winner:
@@ -361,10 +477,10 @@ def run_arena_match(room_id, engine1, engine2, wager_mon, on_chain=False):
             break
 
         current = next_side
-        time.sleep(1.2)  # Delay between moves for watchability
+        if ARENA_MOVE_DELAY:
+            socketio.sleep(ARENA_MOVE_DELAY)  # Delay between moves for watchability
 
     if not winner_side:
-        from hackathon_matches import resolve_tiebreak
         winner_side, reason = resolve_tiebreak(game, start_side)
 
     winner_num = 1 if winner_side == "claude" else 2
@@ -373,15 +489,11 @@ def run_arena_match(room_id, engine1, engine2, wager_mon, on_chain=False):
     # Step 3: Submit result on-chain (only for on-chain matches)
     if on_chain and game_id:
         try:
-            from hackathon_matches import send_tx, contract
-            from eth_account import Account
-            wallet1_key = os.getenv("WALLET1_PRIVATE_KEY") or os.getenv("ORACLE_PRIVATE_KEY")
-            wallet1 = Account.from_key(wallet1_key)
-            receipt = send_tx(wallet1, contract.functions.submitResult(game_id, winner_address))
+            receipt = send_tx(ARENA_WALLET1, contract.functions.submitResult(game_id, winner_address))
             tx_result = receipt.transactionHash.hex()
-            print(f"   🏟️ Arena result submitted: TX={tx_result[:20]}...")
+            log.info("🏟️ Arena result submitted: TX=%.20s...", tx_result)
         except Exception as e:
-            print(f"   ⚠️ Arena submit failed: {e}")
+            log.warning("⚠️ Arena submit failed: %s", e)
             tx_result = f"failed: {e}"
 
     payout = wager_mon * 2 * 0.95  # 5% fee
@@ -395,6 +507,7 @@ def run_arena_match(room_id, engine1, engine2, wager_mon, on_chain=False):
         'explorer_link': f"https://monad.socialscan.io/tx/{tx_result}" if tx_result else None,
     }
     rooms[room_id]['arena_result'] = end_data
+    finish_arena_summary(room_id, winner_num)
     socketio.emit('game_end', end_data, room=room_id)
 
     # Log evidence
@@ -421,7 +534,27 @@ def run_arena_match(room_id, engine1, engine2, wager_mon, on_chain=False):
     }
     evidence_logger.log_match(match_data)
     evidence_logger.generate_summary()
-    print(f"   📝 Arena evidence logged for room {room_id}")
+    log.info("📝 Arena evidence logged for room %s", room_id)
+
+
+def retire_arena_room(room_id):
+    """Move a finished arena room into the bounded finished_arena_rooms LRU.
+    The PuntoGame (decks, hands, board dicts) is replaced by the final board snapshot."""
+    room = rooms.pop(room_id, None)
+    if room is None:
+        return
+    game = room.pop('arena_game', None)
+    if game is not None:
+        room['arena_final_state'] = {
+            'board': room_board(room, game),
+            'current_player': room.get('arena_current_player', 1),
+            'hands': {1: len(game.hand_claude), 2: len(game.hand_openai)},
+        }
+    room.pop('board_cache', None)
+    finished_arena_rooms[room_id] = room
+    finished_arena_rooms.move_to_end(room_id)
+    while len(finished_arena_rooms) > FINISHED_ARENA_CAP:
+        finished_arena_rooms.popitem(last=False)
 
 
 # ============================================================================
@@ -437,48 +570,38 @@ def handle_join_spectate(data):
         return
 
     join_room(room_id)
-    print(f"👁️ Spectator joined room {room_id} (SID: {request.sid})")
-
-    if room_id in rooms:
-        room = rooms[room_id]
+    log.debug("👁️ Spectator joined room %s (SID: %s)", room_id, request.sid)
 
-        # Signal that a spectator has connected (unblocks arena thread)
+    room = rooms.get(room_id) or finished_arena_rooms.get(room_id)
+    if room is not None:
+        # Signal that a spectator has connected (wakes the arena task's wait)
         room['spectator_connected'] = True
+        if 'spectator_ready' in room:
+            room['spectator_ready'].set()
 
-        # Send current match info
-        config = room.get('arena_config', {})
-        match_info = room.get('arena_match_info')
-        if match_info:
-            emit('match_info', match_info)
-        elif config:
-            emit('match_info', {
-                'agent1': {'engine': config.get('engine1', '--'), 'address': ''},
-                'agent2': {'engine': config.get('engine2', '--'), 'address': ''},
-                'wager': room.get('wager', 0),
-                'room_id': room_id,
-                'game_id': room.get('blockchain_game_id'),
-            })
-
-        # If game is already in progress, send current board state
+        # Everything a late joiner needs in one packet: match info (prebuilt at room creation,
+        # replaced once the match is set up), the board if play has started, and the result
         arena_game = room.get('arena_game')
         if arena_game:
-            emit('game_start', {
-                'board': format_board(arena_game.board),
+            board_state = {
+                'board': room_board(room, arena_game),
                 'current_player': room.get('arena_current_player', 1),
                 'hands': {1: len(arena_game.hand_claude), 2: len(arena_game.hand_openai)},
-            })
-
-        # If game already finished, send end result
-        if room.get('arena_result'):
-            emit('game_end', room['arena_result'])
+                'board_seq': room.get('board_seq', 0),
+            }
+        else:
+            board_state = room.get('arena_final_state')
+        emit('spectator_snapshot', {
+            'match_info': room.get('arena_match_info'),
+            'state': board_state,
+            'result': room.get('arena_result'),
+        })
 
 
 @socketio.on('join_wagered_room')
 def handle_join_wagered_room(data):
     """Join room with blockchain verification and full state restore"""
-    print(f"\n{'='*60}")
-    print(f"👤 Player joining wagered room...")
-    print(f"   Data: {data}")
+    log.debug("👤 Player joining wagered room: %s", data)
 
     room_id = data.get('room_id')
     if not room_id:
@@ -489,52 +612,47 @@ def handle_join_wagered_room(data):
     player_address = data.get('address')  # Wallet address
 
     sid = request.sid
-    print(f"   SID: {sid}")
 
     if room_id not in rooms:
-        print(f"❌ Room {room_id} not found!")
+        log.info("❌ Room %s not found!", room_id)
         emit('error', {'message': 'Room not found or expired'})
         return
 
     room = rooms[room_id]
-    print(f"✅ Room found: {room_id}")
-    print(f"   Current players: {list(room['players'].keys())}")
-    print(f"   Room status: {room['status']}")
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("✅ Room found: %s (sid %s), players: %s, status: %s",
+                  room_id, sid, list(room['players']), room['status'])
 
     # Check for rejoin (prefer wallet address, fallback to name)
     existing_player = None
     old_sid = None
-    if player_address:
-        for pid, pdata in room['players'].items():
-            if pdata.get('address') and pdata['address'].lower() == player_address.lower():
-                existing_player = pdata
-                old_sid = pid
-                break
+    address_index = room.setdefault('address_index', {})  # lowercase address -> sid
+    name_index = room.setdefault('name_index', {})  # player name -> sid
+    address_key = player_address.lower() if player_address else None
+    if address_key:
+        old_sid = address_index.get(address_key)
+        existing_player = room['players'].get(old_sid)
 
     if existing_player is None:
-        for pid, pdata in room['players'].items():
-            if pdata['name'] == player_name:
-                existing_player = pdata
-                old_sid = pid
-                break
+        old_sid = name_index.get(player_name)
+        existing_player = room['players'].get(old_sid)
 
     if existing_player:
         # REJOIN logic (same as before)
-        player_role = existing_player['role']
-        print(f"🔄 REJOIN detected: {player_name} as {player_role}")
+        player_role = existing_player.role
+        log.info("🔄 REJOIN detected: %s as %s", player_name, player_role)
 
         if old_sid in room['players']:
             del room['players'][old_sid]
         if old_sid in players:
             del players[old_sid]
 
-        room['players'][sid] = {
-            'sid': sid,
-            'name': player_name,
-            'role': player_role,
-            'address': player_address,
-            'connected': True
-        }
+        name_index.pop(existing_player.name, None)
+        room['players'][sid] = PlayerSlot(sid, player_name, player_role, player_address)
+        room.setdefault('roles', {})[player_role] = sid
+        name_index[player_name] = sid
+        if address_key:
+            address_index[address_key] = sid
 
         players[sid] = {
             'room_id': room_id,
@@ -545,9 +663,8 @@ def handle_join_wagered_room(data):
 
         join_room(room_id)
 
-        print(f"DEBUG: room['game'] = {room.get('game')}")
-        print(f"DEBUG: room['status'] = {room.get('status')}")
-        print(f"DEBUG: room['players'] count = {len(room['players'])}")
+        log.debug("room status = %s, players count = %d, game = %s",
+                  room.get('status'), len(room['players']), room.get('game'))
 
         socketio.emit('player_status', {
             'name': player_name,
@@ -557,25 +674,23 @@ def handle_join_wagered_room(data):
 
         if room['game']:
             game = room['game']
-            print(f"DEBUG: game exists")
-            print(f"DEBUG: game.hand_claude = {game.hand_claude}")
-            print(f"DEBUG: game.hand_openai = {game.hand_openai}")
+            log.debug("hands: claude=%s openai=%s", game.hand_claude, game.hand_openai)
 
             current_state = build_game_state(room)
             if current_state:
                 current_state.update({
                     'your_role': player_role,
-                    'your_cards': sorted(game.hand_claude if player_role == 'player1' else game.hand_openai, key=lambda c: c['value'], reverse=True)
+                    'your_cards': game.get_sorted_hand(ROLE_TO_PLAYER[player_role])
                 })
-                print(f"✅ Sending game_state_restored to {player_name}")
+                log.info("✅ Sending game_state_restored to %s", player_name)
                 emit('game_state_restored', current_state)
             else:
-                print("⚠️  Could not build game state for rejoin")
+                log.warning("⚠️  Could not build game state for rejoin")
         else:
             # FIX: Try to start game if both players are present and on-chain is ready
-            print(f"⚠️  No game exists yet, checking if we can start...")
+            log.debug("No game exists yet, checking if we can start...")
             if len(room['players']) == 2 and room['status'] == 'waiting':
-                print(f"🔄 Both players present, attempting to start game on rejoin...")
+                log.info("🔄 Both players present, attempting to start game on rejoin...")
                 start_wagered_game(room_id)
                 # After start_wagered_game, check if game was created
                 if room['game']:
@@ -584,9 +699,9 @@ def handle_join_wagered_room(data):
                     if current_state:
                         current_state.update({
                             'your_role': player_role,
-                            'your_cards': sorted(game.hand_claude if player_role == 'player1' else game.hand_openai, key=lambda c: c['value'], reverse=True)
+                            'your_cards': game.get_sorted_hand(ROLE_TO_PLAYER[player_role])
                         })
-                        print(f"✅ Game started on rejoin! Sending state to {player_name}")
+                        log.info("✅ Game started on rejoin! Sending state to %s", player_name)
                         emit('game_state_restored', current_state)
 
         return
@@ -599,13 +714,11 @@ def handle_join_wagered_room(data):
     join_room(room_id)
     player_role = 'player1' if len(room['players']) == 0 else 'player2'
 
-    room['players'][sid] = {
-        'sid': sid,
-        'name': player_name,
-        'role': player_role,
-        'address': player_address,
-        'connected': True
-    }
+    room['players'][sid] = PlayerSlot(sid, player_name, player_role, player_address)
+    room.setdefault('roles', {})[player_role] = sid
+    name_index[player_name] = sid
+    if address_key:
+        address_index[address_key] = sid
 
     players[sid] = {
         'room_id': room_id,
@@ -614,9 +727,8 @@ def handle_join_wagered_room(data):
         'address': player_address
     }
 
-    print(f"   ✅ Player joined as {player_role}")
-    print(f"DEBUG: Total players in room: {len(room['players'])}")
-    print(f"DEBUG: Room status: {room['status']}")
+    log.info("✅ %s joined %s as %s", player_name, room_id, player_role)
+    log.debug("players in room = %d, status = %s", len(room['players']), room['status'])
 
     # Notify room
     socketio.emit('player_joined', {
@@ -634,11 +746,11 @@ def handle_join_wagered_room(data):
 
     # Start game if both players joined
     if len(room['players']) == 2 and room['status'] == 'waiting':
-        print(f"🚀 Both players joined! Checking wager_confirmed: {room.get('wager_confirmed', False)}")
+        log.info("🚀 Both players joined! wager_confirmed = %s", room.get('wager_confirmed', False))
         start_wagered_game(room_id)
     else:
-        print(f"⏳ Waiting for more players... (have {len(room['players'])}/2)")
-        print(f"   Wager confirmed: {room.get('wager_confirmed', False)}")
+        log.debug("⏳ Waiting for more players... (have %d/2, wager confirmed: %s)",
+                  len(room['players']), room.get('wager_confirmed', False))
 
 @socketio.on('wager_confirmed')
 def handle_wager_confirmed(data):
@@ -648,11 +760,11 @@ def handle_wager_confirmed(data):
         return
 
     room = rooms[room_id]
-    print(f"📡 wager_confirmed received for room {room_id}")
-    print(f"   Room status: {room['status']}, Players: {len(room['players'])}")
+    log.debug("📡 wager_confirmed received for room %s (status %s, players %d)",
+              room_id, room['status'], len(room['players']))
 
     if room['status'] == 'finished':
-        print(f"   Room already finished, ignoring")
+        log.debug("Room already finished, ignoring")
         return
 
     # Mark that on-chain wager is confirmed (used by join handler)
@@ -660,16 +772,16 @@ def handle_wager_confirmed(data):
 
     if room['status'] == 'playing' and room['game']:
         # Game already in progress, this is a rejoin confirmation
-        print(f"   Game in progress, sending state to reconnected player")
+        log.debug("Game in progress, sending state to reconnected player")
         return
 
     if len(room['players']) < 2:
-        print(f"   Waiting for player2 to socket-join (on-chain ready)")
+        log.debug("Waiting for player2 to socket-join (on-chain ready)")
         return
 
     # Both players present and on-chain confirmed - start game
     if not room['game']:
-        print(f"✅ Wager confirmed for room {room_id}, starting game...")
+        log.info("✅ Wager confirmed for room %s, starting game...", room_id)
         start_wagered_game(room_id)
 
 
@@ -700,10 +812,7 @@ def handle_get_game_state(data):
     if current_state:
         current_state.update({
             'your_role': player_role,
-            'your_cards': sorted(
-                game.hand_claude if player_role == 'player1' else game.hand_openai,
-                key=lambda c: c['value'], reverse=True
-            )
+            'your_cards': game.get_sorted_hand(ROLE_TO_PLAYER[player_role])
         })
         emit('game_state_restored', current_state)
 
@@ -733,18 +842,15 @@ def handle_create_ai_room(data):
         'ai_agent': ai_agent,
         'ai_engine': engine,
         'players': {
-            sid: {
-                'sid': sid,
-                'name': truncateAddress(wallet_address),
-                'role': 'player1',
-                'address': wallet_address,
-                'connected': True
-            }
+            sid: PlayerSlot(sid, truncateAddress(wallet_address), 'player1', wallet_address)
         },
+        'address_index': {wallet_address.lower(): sid} if wallet_address else {},
+        'name_index': {truncateAddress(wallet_address): sid},
+        'roles': {'player1': sid},
         'ai_side': 'openai',
         'wager': 0,
         'status': 'playing',
-        'created': datetime.now().isoformat(),
+        'created': now_iso(),
         'winner': None,
         'current_turn': first_player,
     }
@@ -760,25 +866,25 @@ def handle_create_ai_room(data):
 
     game_state = {
         'status': 'playing',
-        'board': format_board(game.board),
+        'board': room_board(rooms[room_id], game),
         'player1': {
             'name': truncateAddress(wallet_address),
-            'cards': sorted(game.hand_claude, key=lambda c: c['value'], reverse=True)
+            'cards_count': len(game.hand_claude)
         },
         'player2': {
             'name': f'AI ({engine.capitalize()})',
-            'cards': sorted(game.hand_openai, key=lambda c: c['value'], reverse=True)
+            'cards_count': len(game.hand_openai)
         },
         'current_turn': first_player,
         'wager': 0,
         'mode': 'ai',
         'your_role': 'player1',
-        'your_cards': sorted(game.hand_claude, key=lambda c: c['value'], reverse=True)
+        'your_cards': game.get_sorted_hand("claude")
     }
 
-    print(f"🤖 AI room created: {room_id} | First turn: {first_player}")
+    log.info("🤖 AI room created: %s | First turn: %s", room_id, first_player)
+    # One packet for the whole transition: the client starts the game UI from ai_room_created
     emit('ai_room_created', {'room_id': room_id, 'game_state': game_state})
-    emit('game_start', game_state)
 
     # If AI goes first, make its move after a short delay
     if first_player == 'player2':
@@ -808,11 +914,9 @@ def handle_ai_make_move(data):
         return
 
     # Rate limit
-    now = time.time()
-    if sid in last_move_time and (now - last_move_time[sid]) < 0.5:
+    if not check_rate_limit(sid):
         emit('error', {'message': 'Too fast, wait a moment'})
         return
-    last_move_time[sid] = now
 
     row = data['row']
     col = data['col']
@@ -832,7 +936,7 @@ def handle_ai_make_move(data):
     # Check winner after human move
     winner = None
     if game.winner:
-        winner = 'player1' if game.winner == 'claude' else 'player2'
+        winner = PLAYER_TO_ROLE[game.winner]
         room['status'] = 'finished'
         room['winner'] = winner
 
@@ -843,13 +947,11 @@ def handle_ai_make_move(data):
         'player': 'player1',
         'card': card,
         'position': [row, col],
-        'board': format_board(game.board),
-        'player1_cards': sorted(game.hand_claude, key=lambda c: c['value'], reverse=True),
-        'player2_cards': sorted(game.hand_openai, key=lambda c: c['value'], reverse=True),
+        'board': room_board(room, game),
         'winner': winner,
         'next_turn': 'player2' if not winner else None
     }
-    socketio.emit('move_made', move_data, room=room_id)
+    emit_move(room, room_id, move_data)
 
     if winner:
         _log_ai_game_result(room, winner)
@@ -862,7 +964,7 @@ def handle_ai_make_move(data):
 def _ai_respond(room_id):
     """Make AI move with a slight delay for UX"""
     def do_ai_move():
-        time.sleep(0.5)
+        socketio.sleep(0.5)
         room = rooms.get(room_id)
         if not room or room['status'] != 'playing':
             return
@@ -874,11 +976,11 @@ def _ai_respond(room_id):
         # Try agent first (LLM or heuristic), fallback to pure heuristic
         try:
             if ai_agent:
-                move = ai_agent.choose_move(game)
+                move = agent_move(ai_agent, game)
             else:
                 move = heuristic_move(game, 'openai')
         except Exception as e:
-            print(f"⚠️ AI agent move failed: {e}, trying heuristic fallback")
+            log.warning("⚠️ AI agent move failed: %s, trying heuristic fallback", e)
             try:
                 move = heuristic_move(game, 'openai')
             except RuntimeError:
@@ -888,16 +990,14 @@ def _ai_respond(room_id):
             # No valid moves — human wins
             room['status'] = 'finished'
             room['winner'] = 'player1'
-            socketio.emit('move_made', {
+            emit_move(room, room_id, {
                 'player': 'player2',
                 'card': None,
                 'position': None,
-                'board': format_board(game.board),
-                'player1_cards': sorted(game.hand_claude, key=lambda c: c['value'], reverse=True),
-                'player2_cards': sorted(game.hand_openai, key=lambda c: c['value'], reverse=True),
+                'board': room_board(room, game),
                 'winner': 'player1',
                 'next_turn': None
-            }, room=room_id)
+            })
             _log_ai_game_result(room, 'player1')
             return
 
@@ -905,7 +1005,7 @@ def _ai_respond(room_id):
 
         winner = None
         if game.winner:
-            winner = 'player1' if game.winner == 'claude' else 'player2'
+            winner = PLAYER_TO_ROLE[game.winner]
             room['status'] = 'finished'
             room['winner'] = winner
 
@@ -915,38 +1015,34 @@ def _ai_respond(room_id):
             'player': 'player2',
             'card': move['card'],
             'position': [move['y'], move['x']],
-            'board': format_board(game.board),
-            'player1_cards': sorted(game.hand_claude, key=lambda c: c['value'], reverse=True),
-            'player2_cards': sorted(game.hand_openai, key=lambda c: c['value'], reverse=True),
+            'board': room_board(room, game),
             'winner': winner,
             'next_turn': 'player1' if not winner else None
         }
-        socketio.emit('move_made', move_data, room=room_id)
+        emit_move(room, room_id, move_data)
 
         if winner:
             _log_ai_game_result(room, winner)
 
-    thread = threading.Thread(target=do_ai_move, daemon=True)
-    thread.start()
+    socketio.start_background_task(do_ai_move)
 
 
 def _log_ai_game_result(room, winner):
     """Log wallet ELO after AI game ends"""
     try:
-        import wallet_elo
         wallet = None
         for pdata in room['players'].values():
-            if pdata.get('address'):
-                wallet = pdata['address']
+            if pdata.address:
+                wallet = pdata.address
                 break
         if wallet:
             if winner == 'player1':
                 wallet_elo.update_wallet_elo(wallet, 'AI_HEURISTIC', 'win')
             else:
                 wallet_elo.update_wallet_elo('AI_HEURISTIC', wallet, 'win')
-            print(f"📊 Wallet ELO updated: {wallet} {'won' if winner == 'player1' else 'lost'} vs AI")
+            log.info("📊 Wallet ELO updated: %s %s vs AI", wallet, 'won' if winner == 'player1' else 'lost')
     except Exception as e:
-        print(f"⚠️ Wallet ELO update failed: {e}")
+        log.warning("⚠️ Wallet ELO update failed: %s", e)
 
 
 def truncateAddress(address):
@@ -956,104 +1052,138 @@ def truncateAddress(address):
     return address[:6] + '...' + address[-4:]
 
 
+def check_rate_limit(sid):
+    """Allow one move per MIN_MOVE_INTERVAL per socket. Records the move when allowed.
+    Socket.IO pins a sid to one worker, so a per-process dict is exact here."""
+    now = time.monotonic()
+    last = last_move_time.get(sid)
+    if last is not None and now - last < MIN_MOVE_INTERVAL:
+        return False
+    last_move_time[sid] = now
+    return True
+
+
+def take_arena_start_token(key):
+    """Spend one /api/arena/start token for `key`; False if its bucket is empty."""
+    global arena_buckets_swept
+    now = time.monotonic()
+    if now - arena_buckets_swept >= ARENA_BUCKET_IDLE:
+        # At most one sweep per idle period keeps the dict bounded by recently active clients
+        arena_buckets_swept = now
+        for idle_key in [k for k, b in arena_start_buckets.items() if now - b.last >= ARENA_BUCKET_IDLE]:
+            del arena_start_buckets[idle_key]
+    bucket = arena_start_buckets.get(key)
+    if bucket is None:
+        bucket = arena_start_buckets[key] = TokenBucket(ARENA_START_BURST, now)
+    else:
+        bucket.tokens = min(ARENA_START_BURST, bucket.tokens + (now - bucket.last) * ARENA_START_RATE)
+        bucket.last = now
+    if bucket.tokens < 1:
+        return False
+    bucket.tokens -= 1
+    return True
+
+
 @socketio.on('disconnect')
 def handle_disconnect():
     sid = request.sid
-    if sid not in players:
+    last_move_time.pop(sid, None)
+    player = players.pop(sid, None)
+    if player is None:
         return
 
-    room_id = players[sid]['room_id']
-    player_name = players[sid]['name']
-    player_role = players[sid]['role']
-
-    if room_id in rooms and sid in rooms[room_id]['players']:
-        rooms[room_id]['players'][sid]['connected'] = False
-
-    del players[sid]
+    # Direct lookups only: the seat stays (for rejoin), just flagged as disconnected
+    room_id = player['room_id']
+    room = rooms.get(room_id)
+    slot = room['players'].get(sid) if room else None
+    if slot is not None:
+        slot.connected = False
 
     socketio.emit('player_status', {
-        'name': player_name,
-        'role': player_role,
+        'name': player['name'],
+        'role': player['role'],
         'status': 'disconnected'
     }, room=room_id)
 
 def start_wagered_game(room_id):
     """Start game (after both players deposited wager)"""
-    print(f"\n🎮 start_wagered_game() called for room {room_id}")
     room = rooms[room_id]
-    print(f"DEBUG: Room status = {room['status']}")
-    print(f"DEBUG: Players count = {len(room['players'])}")
-    print(f"DEBUG: Wager confirmed flag = {room.get('wager_confirmed', False)}")
+    log.debug("🎮 start_wagered_game(%s): status = %s, players = %d, wager confirmed = %s",
+              room_id, room['status'], len(room['players']), room.get('wager_confirmed', False))
 
     # Guard against double initialization
     if room['status'] != 'waiting':
-        print(f"DEBUG: Room not in 'waiting' state ({room['status']}), skipping")
+        log.debug("Room not in 'waiting' state (%s), skipping", room['status'])
         return
 
     # Skip if game already exists
     if room['game']:
-        print(f"DEBUG: Game already exists, skipping init")
+        log.debug("Game already exists, skipping init")
         return
 
     # Verify both players deposited on-chain (if wagering enabled)
     if WAGERING_ENABLED and room['wager'] > 0:
         # If frontend already confirmed on-chain, trust it
         if room.get('wager_confirmed'):
-            print(f"✅ Using frontend wager_confirmed flag (on-chain already verified)")
+            log.debug("✅ Using frontend wager_confirmed flag (on-chain already verified)")
         else:
-            print(f"DEBUG: Checking blockchain for room {room_id}...")
+            log.debug("Checking blockchain for room %s...", room_id)
             # Check blockchain for game creation
             on_chain_game = blockchain.get_game_by_room_id(room_id)
 
             if not on_chain_game or on_chain_game['state'] != 1:  # 1 = ACTIVE
-                print("⚠️  Waiting for on-chain wager confirmation...")
+                log.info("⚠️  Waiting for on-chain wager confirmation...")
                 socketio.emit('waiting_for_wager', {
                     'message': 'Waiting for blockchain confirmation...'
                 }, room=room_id)
                 return
             else:
-                print(f"✅ On-chain game verified: {on_chain_game}")
+                log.info("✅ On-chain game verified: %s", on_chain_game)
+                room['blockchain_game_id'] = on_chain_game['gameId']
+
+        # Resolve the on-chain game ID now, off the move path, so the winning move doesn't wait on RPC
+        if not room.get('blockchain_game_id'):
+            socketio.start_background_task(chain_game_id, room_id, room)
 
     # Initialize game
-    print(f"DEBUG: Initializing PuntoGame...")
     room['game'] = PuntoGame()
     room['status'] = 'playing'
 
     player1, player2 = get_players_by_role(room)
     if not player1 or not player2:
-        print("⚠️  Cannot start game: missing player1 or player2")
+        log.warning("⚠️  Cannot start game: missing player1 or player2")
         return
 
     first_player = random.choice(['player1', 'player2'])
     room['current_turn'] = first_player
 
-    print(f"🎲 Coin flip: {first_player} starts first!")
-    print(f"DEBUG: Player1 cards = {room['game'].hand_claude}")
-    print(f"DEBUG: Player2 cards = {room['game'].hand_openai}")
+    log.debug("🎲 Coin flip: %s starts first! hands: %s / %s",
+              first_player, room['game'].hand_claude, room['game'].hand_openai)
 
     game_state = build_game_state(room)
     if not game_state:
-        print("⚠️  Failed to build game state, aborting start")
+        log.warning("⚠️  Failed to build game state, aborting start")
         return
 
-    print(f"📡 Emitting game_start event to room {room_id}")
-    print(f"   Game state: player1 has {len(game_state['player1']['cards'])} cards")
-    print(f"   Game state: player2 has {len(game_state['player2']['cards'])} cards")
-    socketio.emit('game_start', game_state, room=room_id)
-    print(f"✅ Game started successfully!")
-    print(f"{'='*60}\n")
+    # Each player gets the public state plus their own hand, so neither sees the other's cards
+    game = room['game']
+    for player in (player1, player2):
+        socketio.emit('game_start', {
+            **game_state,
+            'your_role': player.role,
+            'your_cards': game.get_sorted_hand(ROLE_TO_PLAYER[player.role]),
+        }, room=player.sid)
+    log.info("✅ Game started in room %s (%s first)", room_id, first_player)
 
 @socketio.on('make_move')
 def handle_make_move_wagered(data):
     """Handle move with blockchain result submission"""
     try:
         sid = request.sid
-        print(f"\n{'='*60}")
-        print(f"📥 Received move from {sid}")
-        print(f"   Move data: {data}")
+        log.debug("📥 Received move from %s: %s", sid, data)
 
         if sid not in players:
-            print(f"❌ SID {sid} not in players!")
+            log.warning("❌ SID %s not in players!", sid)
             emit('error', {'message': 'Not in a game'})
             return
 
@@ -1064,17 +1194,15 @@ def handle_make_move_wagered(data):
         # Turn enforcement: reject if not this player's turn
         player_role = players[sid]['role']
         if room.get('current_turn') and room['current_turn'] != player_role:
-            print(f"❌ Turn violation: {player_role} tried to move on {room['current_turn']}'s turn")
+            log.info("❌ Turn violation: %s tried to move on %s's turn", player_role, room['current_turn'])
             emit('error', {'message': 'Not your turn'})
             return
 
         # Rate limit: reject moves faster than 500ms
-        now = time.time()
-        if sid in last_move_time and (now - last_move_time[sid]) < 0.5:
-            print(f"❌ Rate limit: {player_role} moving too fast ({now - last_move_time[sid]:.2f}s)")
+        if not check_rate_limit(sid):
+            log.info("❌ Rate limit: %s moving too fast", player_role)
             emit('error', {'message': 'Too fast, wait a moment'})
             return
-        last_move_time[sid] = now
 
         row = data['row']
         col = data['col']
@@ -1085,83 +1213,61 @@ def handle_make_move_wagered(data):
         else:
             card = data['card']  # dict from updated frontend
 
-        game_player = 'claude' if player_role == 'player1' else 'openai'
-        print(f"   Player: {player_role} ({game_player})")
-        print(f"   Card: {card}, Position: ({row}, {col})")
+        game_player = ROLE_TO_PLAYER[player_role]
+        log.debug("   %s (%s) plays %s at (%s, %s)", player_role, game_player, card, row, col)
 
         # Validate and make move
         is_valid, msg = game.is_valid_move(col, row, card, game_player)
         if not is_valid:
-            print(f"❌ Invalid move: {msg}")
+            log.info("❌ Invalid move: %s", msg)
             emit('error', {'message': f'Invalid move: {msg}'})
             return
 
         game.make_move(col, row, card, game_player)
-        print(f"✅ Move applied successfully!")
 
         # Check winner
         winner = None
         if game.winner:
-            winner = 'player1' if game.winner == 'claude' else 'player2'
+            winner = PLAYER_TO_ROLE[game.winner]
             room['status'] = 'finished'
             room['winner'] = winner
-            print(f"🏆 WINNER: {winner}!")
-
-            # Submit to blockchain
-            if WAGERING_ENABLED and room['wager'] > 0:
-                winner_address = room['players'][sid]['address'] if winner == player_role else \
-                                [p['address'] for p in room['players'].values() if p['role'] != player_role][0]
-
-                print(f"🏆 Game finished! Submitting to blockchain...")
-
-                # Get blockchain game ID
-                on_chain_game = blockchain.get_game_by_room_id(room_id)
-                if on_chain_game:
-                    game_id = on_chain_game['gameId']  # Assuming we track this
-                    tx_hash = blockchain.submit_result(game_id, winner_address)
-
-                    if tx_hash:
-                        print(f"✅ Result submitted! TX: {tx_hash}")
+            log.info("🏆 WINNER in room %s: %s!", room_id, winner)
+            # Only the mover's card can complete a line, so the winner is this socket's seat
+            winner_addr = room['players'][sid].address
 
             # Log wallet ELO for PvP
             try:
-                import wallet_elo
-                winner_addr = room['players'][sid]['address'] if winner == player_role else \
-                    [p['address'] for p in room['players'].values() if p['role'] != player_role][0]
-                loser_addr = [p['address'] for p in room['players'].values() if p['address'].lower() != winner_addr.lower()][0]
+                loser_addr = get_player_by_role(room, OTHER_ROLE[winner]).address
                 wallet_elo.update_wallet_elo(winner_addr, loser_addr, 'win')
-                print(f"📊 PvP Wallet ELO: {winner_addr[:10]}... won vs {loser_addr[:10]}...")
+                log.info("📊 PvP Wallet ELO: %.10s... won vs %.10s...", winner_addr, loser_addr)
             except Exception as elo_err:
-                print(f"⚠️ PvP Wallet ELO update failed: {elo_err}")
+                log.warning("⚠️ PvP Wallet ELO update failed: %s", elo_err)
 
         # Update turn
-        next_turn = 'player2' if player_role == 'player1' else 'player1'
+        next_turn = OTHER_ROLE[player_role]
         room['current_turn'] = next_turn
-        print(f"🔄 Next turn: {next_turn}")
 
         # Broadcast move
         move_data = {
             'player': player_role,
             'card': card,
             'position': [row, col],
-            'board': format_board(game.board),
-            'player1_cards': sorted(game.hand_claude, key=lambda c: c['value'], reverse=True),
-            'player2_cards': sorted(game.hand_openai, key=lambda c: c['value'], reverse=True),
+            'board': room_board(room, game),
             'winner': winner,
             'next_turn': next_turn
         }
 
-        print(f"📡 Broadcasting move to room {room_id}")
-        print(f"   Player1 cards left: {len(move_data['player1_cards'])}")
-        print(f"   Player2 cards left: {len(move_data['player2_cards'])}")
-        socketio.emit('move_made', move_data, room=room_id)
-        print(f"✅ Move broadcasted!")
-        print(f"{'='*60}\n")
+        emit_move(room, room_id, move_data)
+        log.debug("📡 Move broadcast to room %s, next turn %s, cards left %s",
+                  room_id, next_turn, move_data['hand_counts'])
+
+        # Settle on-chain after the broadcast, in the background: the tx can take seconds
+        if winner and WAGERING_ENABLED and room['wager'] > 0:
+            log.info("🏆 Game finished! Submitting to blockchain...")
+            socketio.start_background_task(submit_wagered_result, room_id, room, winner_addr)
 
     except Exception as e:
-        print(f"❌ ERROR: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("❌ ERROR: %s", e)
         emit('error', {'message': str(e)})
 
 
@@ -1170,36 +1276,40 @@ def handle_leave_game(data):
     """Player leaves current game (e.g. Play Again). Cleans up server state."""
     sid = request.sid
     room_id = data.get('room_id')
-    print(f"👋 Player {sid} leaving game {room_id}")
+    log.info("👋 Player %s leaving game %s", sid, room_id)
 
     if room_id:
         leave_room(room_id)
 
     # Get player info before cleanup
-    leaving_role = None
-    if sid in players:
-        leaving_role = players[sid].get('role')
-        del players[sid]
-
-    # Remove from room's players dict
-    if room_id and room_id in rooms:
-        room = rooms[room_id]
-        if sid in room['players']:
-            del room['players'][sid]
+    player = players.pop(sid, None)
+    leaving_role = player.get('role') if player else None
+
+    # Remove from room's players dict and its address/name/role indexes
+    room = rooms.get(room_id) if room_id else None
+    if room is not None:
+        leaving = room['players'].pop(sid, None)
+        if leaving is not None:
+            if leaving.address:
+                room.get('address_index', {}).pop(leaving.address.lower(), None)
+            if room.get('name_index', {}).get(leaving.name) == sid:
+                del room['name_index'][leaving.name]
+            roles = room.get('roles', {})
+            if roles.get(leaving.role) == sid:
+                del roles[leaving.role]
 
         # If game was active, forfeit to remaining player
         if room.get('status') == 'playing' and room.get('game') and leaving_role:
-            remaining = [p for p in room['players'].values() if p.get('role') != leaving_role]
+            remaining = get_player_by_role(room, OTHER_ROLE[leaving_role])
             if remaining:
-                winner_role = remaining[0]['role']
+                winner_role = remaining.role
                 room['status'] = 'finished'
                 room['winner'] = winner_role
-                print(f"🏳️ {leaving_role} forfeited! {winner_role} wins by forfeit.")
+                log.info("🏳️ %s forfeited! %s wins by forfeit.", leaving_role, winner_role)
                 socketio.emit('move_made', {
                     'player': leaving_role,
-                    'board': format_board(room['game'].board),
-                    'player1_cards': [],
-                    'player2_cards': [],
+                    'board': room_board(room, room['game']),
+                    'hand_counts': {'player1': 0, 'player2': 0},
                     'winner': winner_role,
                     'next_turn': None,
                     'forfeit': True
@@ -1210,15 +1320,54 @@ def handle_leave_game(data):
 # HELPERS
 # ============================================================================
 
+def get_player_by_role(room, role):
+    """Seated PlayerSlot for 'player1'/'player2' via the room's role -> sid index, or None"""
+    return room['players'].get(room.get('roles', {}).get(role))
+
 def get_players_by_role(room):
-    player1 = None
-    player2 = None
-    for pdata in room['players'].values():
-        if pdata.get('role') == 'player1':
-            player1 = pdata
-        elif pdata.get('role') == 'player2':
-            player2 = pdata
-    return player1, player2
+    return get_player_by_role(room, 'player1'), get_player_by_role(room, 'player2')
+
+def chain_game_id(room_id, room):
+    """On-chain gameId for a wagered room. Fetched over RPC once, then kept on the room:
+    the room -> game mapping never changes once the game exists."""
+    if not room.get('blockchain_game_id'):
+        on_chain_game = blockchain.get_game_by_room_id(room_id)
+        if on_chain_game and on_chain_game['gameId']:
+            room['blockchain_game_id'] = on_chain_game['gameId']
+    return room.get('blockchain_game_id')
+
+def submit_wagered_result(room_id, room, winner_address):
+    """Background task: submit a finished wagered game's winner on-chain, then
+    send the room result_submitted with the tx hash"""
+    game_id = chain_game_id(room_id, room)
+    if not game_id:
+        log.warning("⚠️  No on-chain game for room %s, result not submitted", room_id)
+        return
+    tx_hash = blockchain.submit_result(game_id, winner_address)
+    if tx_hash:
+        log.info("✅ Result submitted! TX: %s", tx_hash)
+        socketio.emit('result_submitted', {'tx_hash': tx_hash}, room=room_id)
+
+def agent_move(agent, game):
+    """MatchAgent.choose_move without stalling the hub: heuristic engines are CPU-bound and
+    run on eventlet's native thread pool; LLM engines are HTTP I/O over monkey-patched
+    sockets, which already yield to other green threads"""
+    if agent.llm_player is None:
+        return tpool.execute(agent.choose_move, game)
+    return agent.choose_move(game)
+
+def emit_move(room, room_id, move_data):
+    """Broadcast a move: each seated player gets their own hand as hand_update, then the
+    room gets the public move_made with hand sizes only (no one sees the other hand)"""
+    game = room['game']
+    for role in ('player1', 'player2'):
+        player = get_player_by_role(room, role)
+        if player is not None and player.connected:
+            socketio.emit('hand_update', {'cards': game.get_sorted_hand(ROLE_TO_PLAYER[role])}, room=player.sid)
+    move_data['hand_counts'] = {'player1': len(game.hand_claude), 'player2': len(game.hand_openai)}
+    # One room emit (no callback): the packet is encoded once for every participant, so
+    # never replace this with a per-sid loop
+    socketio.emit('move_made', move_data, room=room_id)
 
 def build_game_state(room):
     game = room.get('game')
@@ -1229,38 +1378,55 @@ def build_game_state(room):
     if not player1 or not player2:
         return None
 
+    # Public state: hand sizes only; each player's own cards go to them alone as your_cards
     return {
         'status': room['status'],
-        'board': format_board(game.board),
+        'board': room_board(room, game),
         'player1': {
-            'name': player1['name'],
-            'cards': sorted(game.hand_claude, key=lambda c: c['value'], reverse=True)
+            'name': player1.name,
+            'cards_count': len(game.hand_claude)
         },
         'player2': {
-            'name': player2['name'],
-            'cards': sorted(game.hand_openai, key=lambda c: c['value'], reverse=True)
+            'name': player2.name,
+            'cards_count': len(game.hand_openai)
         },
         'current_turn': room.get('current_turn', 'player1'),
         'wager': room['wager'],
         'mode': room.get('mode', 'pvp_wagered')
     }
 
+def room_board(room, game):
+    """format_board for a room's game, cached on the room until the next move so the
+    move_made broadcast, state restores and late spectators share one formatted board.
+    A single move since the cached turn only reformats the cell it placed."""
+    cached = room.get('board_cache')
+    if cached is not None and cached[0] is game and cached[1] == game.current_turn:
+        return cached[2]
+    if cached is not None and cached[0] is game and cached[1] == game.current_turn - 1 and game.last_move:
+        # Copy-on-write: the previous board may still be referenced by an earlier payload
+        x, y = game.last_move
+        formatted = cached[2][:]
+        row = formatted[y][:]
+        row[x] = format_cell(game.board[y][x])
+        formatted[y] = row
+    else:
+        formatted = format_board(game.board)
+    room['board_cache'] = (game, game.current_turn, formatted)
+    return formatted
+
 def format_board(board):
     """Format board for frontend"""
-    result = []
-    for row in board:
-        result_row = []
-        for cell in row:
-            if cell is None:
-                result_row.append(None)
-            else:
-                result_row.append({
-                    'card': cell['value'],
-                    'player': 'player1' if cell['player'] == 'claude' else 'player2',
-                    'color': cell['color'],
-                })
-        result.append(result_row)
-    return result
+    return [[None if cell is None else {
+                'card': cell['value'],
+                'player': PLAYER_TO_ROLE[cell['player']],
+                'color': cell['color'],
+            } for cell in row] for row in board]
+
+def format_cell(cell):
+    """Format a single board cell the same way format_board does"""
+    if cell is None:
+        return None
+    return {'card': cell['value'], 'player': PLAYER_TO_ROLE[cell['player']], 'color': cell['color']}
 
 # ============================================================================
 # MAIN
@@ -1270,53 +1436,31 @@ _arena_loop_started = False
 
 def arena_background_loop():
     """Background loop: keeps at least one arena match running at all times."""
-    time.sleep(8)  # Wait for server to fully start
-    print("🏟️ Arena background loop started — matches will run continuously")
+    socketio.sleep(8)  # Wait for server to fully start
+    log.info("🏟️ Arena background loop started — matches will run continuously")
     while True:
         try:
-            # Check if there's an active (non-finished) arena match
-            # Also kill stale matches (stuck >3 min without result)
-            now = datetime.now()
-            for rid, r in list(rooms.items()):
-                if r.get('mode') == 'arena' and not r.get('arena_result'):
-                    try:
-                        created = datetime.fromisoformat(r.get('created', ''))
-                        if (now - created).total_seconds() > 180:
-                            print(f"🏟️ Cleaning stale arena match: {rid}")
-                            r['arena_result'] = {'winner': None, 'reason': 'timeout'}
-                    except (ValueError, TypeError):
-                        pass
-            active = any(
-                r.get('mode') == 'arena' and not r.get('arena_result')
-                for r in rooms.values()
-            )
-            if not active:
+            # Kill stale matches (stuck >3 min without result): only expired deadlines are popped
+            now = time.monotonic()
+            while arena_expiry and arena_expiry[0][0] <= now:
+                _, rid = heapq.heappop(arena_expiry)
+                r = rooms.get(rid)
+                if r is not None and not r.get('arena_result'):
+                    log.info("🏟️ Cleaning stale arena match: %s", rid)
+                    r['arena_result'] = {'winner': None, 'reason': 'timeout'}
+                    finish_arena_summary(rid, None)
+            # arena_live holds exactly the arena rooms that have no result yet
+            if not arena_live:
                 # Start a new heuristic vs heuristic match
                 room_id = f"arena_{secrets.token_hex(4)}"
-                rooms[room_id] = {
-                    'id': room_id,
-                    'mode': 'arena',
-                    'game': None,
-                    'players': {},
-                    'wager': 0.01,
-                    'status': 'arena_pending',
-                    'created': datetime.now().isoformat(),
-                    'winner': None,
-                    'blockchain_game_id': None,
-                    'arena_config': {'engine1': 'heuristic', 'engine2': 'heuristic'},
-                }
-                thread = threading.Thread(
-                    target=run_arena_match,
-                    args=(room_id, 'heuristic', 'heuristic', 0.01),
-                    daemon=True,
-                )
-                thread.start()
-                print(f"🏟️ Auto-started arena match: {room_id}")
+                new_arena_room(room_id, 'heuristic', 'heuristic', 0.01)
+                socketio.start_background_task(run_arena_match, room_id, 'heuristic', 'heuristic', 0.01)
+                log.info("🏟️ Auto-started arena match: %s", room_id)
             # Check every 10 seconds
-            time.sleep(10)
+            socketio.sleep(10)
         except Exception as e:
-            print(f"❌ Arena loop error: {e}")
-            time.sleep(30)
+            log.exception("❌ Arena loop error: %s", e)
+            socketio.sleep(30)
 
 
 def start_arena_loop_once():
@@ -1325,8 +1469,7 @@ def start_arena_loop_once():
     if _arena_loop_started:
         return
     _arena_loop_started = True
-    t = threading.Thread(target=arena_background_loop, daemon=True)
-    t.start()
+    socketio.start_background_task(arena_background_loop)
 
 
 # Start arena loop at import time (works for both gunicorn and __main__)
@@ -1341,7 +1484,7 @@ if __name__ == '__main__':
     print(f"\n🌐 Server: http://127.0.0.1:{port}")
     print(f"💰 Wagering: {'ENABLED' if WAGERING_ENABLED else 'DISABLED'}")
     if WAGERING_ENABLED:
-        print(f"📍 Contract: {os.getenv('CONTRACT_ADDRESS', 'Not set')}")
+        print(f"📍 Contract: {CONTRACT_ADDRESS or 'Not set'}")
     print("\n" + "="*60 + "\n")
 
-    socketio.run(app, host='0.0.0.0', port=port, debug=True, allow_unsafe_werkzeug=True)
+    socketio.run(app, host='0.0.0.0', port=port, debug=DEBUG, allow_unsafe_werkzeug=True)
@@ -52,11 +52,8 @@ def on_game_start(data):
     print(f'\n🔵 Player 1: {data["player1"]["name"]}')
     print(f'🔴 Player 2: {data["player2"]["name"]}\n')
 
-    # Set my cards
-    if game['role'] == 'player1':
-        game['my_cards'] = data['player1']['cards']
-    else:
-        game['my_cards'] = data['player2']['cards']
+    # Set my cards (sent only to this player; the opponent's hand is just a count)
+    game['my_cards'] = data['your_cards']
 
     game['my_turn'] = (data['current_turn'] == game['role'])
 
@@ -84,19 +81,18 @@ def on_game_start(data):
     else:
         print('\n🔴 Waiting for opponent...')
 
+@sio.on('hand_update')
+def on_hand_update(data):
+    game['my_cards'] = data['cards']
+
 @sio.on('move_made')
 def on_move_made(data):
     player = '🔵' if data['player'] == 'player1' else '🔴'
     print(f'\n{player} Move: Card {data["card"]} → ({data["position"][0]}, {data["position"][1]})')
 
-    # Update state
+    # Update state (own cards come via hand_update, sent just before this)
     game['board'] = data['board']
 
-    if game['role'] == 'player1':
-        game['my_cards'] = data['player1_cards']
-    else:
-        game['my_cards'] = data['player2_cards']
-
     game['my_turn'] = (data['next_turn'] == game['role'])
 
     print_board(data['board'])
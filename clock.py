@@ -0,0 +1,23 @@
+"""
+Cheap wall-clock timestamps for room/game bookkeeping.
+
+`created` / `started` fields only need second resolution, so the ISO string is
+formatted once per second and reused by every caller within that second.
+"""
+
+import time
+from datetime import datetime
+
+_cached_second = None
+_cached_iso = ""
+
+
+def now_iso() -> str:
+    """Local time as an ISO-8601 string, truncated to the second."""
+    global _cached_second, _cached_iso
+    second = int(time.time())
+    if second != _cached_second:
+        # Swap the string in before the key so a concurrent reader never pairs the new key with the old string
+        _cached_iso = datetime.fromtimestamp(second).isoformat()
+        _cached_second = second
+    return _cached_iso
@@ -4,6 +4,7 @@ Full rules: 4 colors (2 per player), 5-in-a-row of SAME COLOR to win.
 """
 
 import random
+from operator import itemgetter
 
 # Player 1 (claude) uses RED + BLUE, Player 2 (openai) uses GREEN + YELLOW
 PLAYER_COLORS = {
@@ -13,6 +14,14 @@ PLAYER_COLORS = {
 
 COLOR_SYMBOLS = {'red': 'R', 'blue': 'B', 'green': 'G', 'yellow': 'Y'}
 
+# Seat roles used by the web apps <-> player keys used by the game logic
+ROLE_TO_PLAYER = {'player1': 'claude', 'player2': 'openai'}
+PLAYER_TO_ROLE = {'claude': 'player1', 'openai': 'player2'}
+OTHER_ROLE = {'player1': 'player2', 'player2': 'player1'}
+
+# Sort key for card dicts (C-level, no per-call lambda frame)
+CARD_VALUE = itemgetter('value')
+
 
 def _color_to_player(color):
     """Return which player owns a given color."""
@@ -27,6 +36,7 @@ class PuntoGame:
         self.board = [[None for _ in range(6)] for _ in range(6)]
         self.current_turn = 0
         self.winner = None
+        self.last_move = None  # (x, y) of the most recent make_move
 
         # Deck: 9 cards per color (values 1-9), 2 colors per player = 18 cards each
         self.deck_claude = [{'value': v, 'color': c}
@@ -37,6 +47,9 @@ class PuntoGame:
         # Current hand (2 cards each)
         self.hand_claude = []
         self.hand_openai = []
+        # player -> (current_turn, hand list, tuple of its cards sorted high-to-low).
+        # Holding the list itself (not its id) means a replaced hand can't alias a stale entry
+        self._sorted_hands = {}
 
         self._deal_initial_cards()
 
@@ -114,62 +127,32 @@ class PuntoGame:
             hand.append(deck.pop())
 
         self.current_turn += 1
-        self._check_winner()
+        self.last_move = (x, y)
+        self._check_winner_at(x, y)
         return True
 
-    def _check_winner(self):
-        """Check for 5 cards of the SAME COLOR in a line."""
-        for color in ['red', 'blue', 'green', 'yellow']:
-            # Horizontal
-            for y in range(6):
-                for x in range(2):  # 6-5+1 = 2 starting positions
-                    if self._check_line_color(x, y, 1, 0, 5, color):
-                        player = _color_to_player(color)
-                        print(f"  WIN: {player} ({color}) - Horizontal at row={y}, col={x}")
-                        self.winner = player
-                        return
-
-            # Vertical
-            for x in range(6):
-                for y in range(2):
-                    if self._check_line_color(x, y, 0, 1, 5, color):
-                        player = _color_to_player(color)
-                        print(f"  WIN: {player} ({color}) - Vertical at col={x}, row={y}")
-                        self.winner = player
-                        return
-
-            # Diagonal down-right
-            for x in range(2):
-                for y in range(2):
-                    if self._check_line_color(x, y, 1, 1, 5, color):
-                        player = _color_to_player(color)
-                        print(f"  WIN: {player} ({color}) - Diagonal DR at ({x},{y})")
-                        self.winner = player
-                        return
-
-            # Diagonal down-left
-            for x in range(4, 6):
-                for y in range(2):
-                    if self._check_line_color(x, y, -1, 1, 5, color):
-                        player = _color_to_player(color)
-                        print(f"  WIN: {player} ({color}) - Diagonal DL at ({x},{y})")
-                        self.winner = player
-                        return
-
-    def _check_line_color(self, start_x, start_y, dx, dy, length, color):
-        """Check if there is a line of `length` cells of the given color."""
-        for i in range(length):
-            x = start_x + i * dx
-            y = start_y + i * dy
-
-            if not (0 <= x < 6 and 0 <= y < 6):
-                return False
-
-            cell = self.board[y][x]
-            if cell is None or cell['color'] != color:
-                return False
-
-        return True
+    def _check_winner_at(self, x, y):
+        """Check for a win created by the card just placed at (x, y).
+        Only a line through that cell, in its color, can be new, so count the
+        same-color run through it in each direction instead of rescanning the board."""
+        color = self.board[y][x]['color']
+        for name, dx, dy in (("Horizontal", 1, 0), ("Vertical", 0, 1),
+                             ("Diagonal DR", 1, 1), ("Diagonal DL", -1, 1)):
+            run = 1
+            for sign in (1, -1):
+                nx, ny = x + sign * dx, y + sign * dy
+                while 0 <= nx < 6 and 0 <= ny < 6:
+                    cell = self.board[ny][nx]
+                    if cell is None or cell['color'] != color:
+                        break
+                    run += 1
+                    nx += sign * dx
+                    ny += sign * dy
+            if run >= 5:
+                player = _color_to_player(color)
+                print(f"  WIN: {player} ({color}) - {name} through ({x},{y})")
+                self.winner = player
+                return
 
     def is_game_over(self):
         """Check if game is over."""
@@ -193,6 +176,16 @@ class PuntoGame:
         else:
             return self.hand_openai.copy()
 
+    def get_sorted_hand(self, player):
+        """Return player's hand sorted by value, highest first, as a tuple.
+        Cached until the hand changes (a move, or the hand list being replaced)."""
+        hand = self.hand_claude if player == "claude" else self.hand_openai
+        cached = self._sorted_hands.get(player)
+        if cached is None or cached[0] != self.current_turn or cached[1] is not hand:
+            cached = (self.current_turn, hand, tuple(sorted(hand, key=CARD_VALUE, reverse=True)))
+            self._sorted_hands[player] = cached
+        return cached[2]
+
     def format_board(self):
         """Format board for CLI display with color symbols."""
         result = "\n  0  1  2  3  4  5\n"
@@ -11,10 +11,11 @@ from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
 
 from web3 import Web3
+from web3.logs import DISCARD
 from eth_account import Account
 from dotenv import load_dotenv
 
-from game_logic import PuntoGame
+from game_logic import PuntoGame, CARD_VALUE
 from ai_player import AIPlayer
 import evidence_logger
 
@@ -99,6 +100,17 @@ CONTRACT_ABI = [
         "stateMutability": "view",
         "type": "function",
     },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "gameId", "type": "uint256"},
+            {"indexed": True, "name": "player1", "type": "address"},
+            {"indexed": False, "name": "wager", "type": "uint256"},
+            {"indexed": False, "name": "roomId", "type": "string"},
+        ],
+        "name": "GameCreated",
+        "type": "event",
+    },
 ]
 
 # ============================================================================
@@ -113,14 +125,20 @@ contract = (
 )
 
 
-def send_tx(account, tx_func, value=0):
-    """Build, sign, and send transaction"""
+def tx_params(account) -> Tuple[int, int]:
+    """(nonce, gas price) for account's next transaction, so callers can fetch them ahead of time"""
+    return w3.eth.get_transaction_count(account.address, "pending"), w3.eth.gas_price
+
+
+def send_tx(account, tx_func, value=0, params: Optional[Tuple[int, int]] = None):
+    """Build, sign, and send transaction. params: prefetched tx_params(account), else fetched now"""
+    nonce, gas_price = params or tx_params(account)
     tx = tx_func.build_transaction(
         {
             "from": account.address,
-            "nonce": w3.eth.get_transaction_count(account.address),
+            "nonce": nonce,
             "gas": 300000,
-            "gasPrice": w3.eth.gas_price,
+            "gasPrice": gas_price,
             "value": value,
         }
     )
@@ -130,6 +148,15 @@ def send_tx(account, tx_func, value=0):
     return receipt
 
 
+def created_game_id(receipt) -> int:
+    """Game ID from a createGame receipt's GameCreated log (no extra RPC).
+    Falls back to gameCounter(), which can race with another createGame."""
+    events = contract.events.GameCreated().process_receipt(receipt, errors=DISCARD)
+    if events:
+        return events[0]["args"]["gameId"]
+    return contract.functions.gameCounter().call()
+
+
 # ============================================================================
 # AGENT ENGINES
 # ============================================================================
@@ -140,14 +167,25 @@ def other_player(player: str) -> str:
 
 
 def valid_moves(game: PuntoGame, player: str) -> List[Dict]:
-    hand = sorted(game.get_hand(player), key=lambda c: c['value'], reverse=True)
+    hand = sorted(game.get_hand(player), key=CARD_VALUE, reverse=True)
+    # Same moves and order as calling game.is_valid_move per (card, cell), but the board is
+    # scanned once: each reachable cell keeps the value a card must beat (0 when empty)
+    board = game.board
+    first_move = game._board_is_empty()
+    targets: List[Tuple[int, int, int]] = []
+    for y in range(6):
+        row = board[y]
+        for x in range(6):
+            cell = row[x]
+            if cell is not None:
+                targets.append((x, y, cell["value"]))
+            elif first_move or game._has_adjacent_card(x, y):
+                targets.append((x, y, 0))
+
     moves: List[Dict] = []
     for card in hand:
-        for y in range(6):
-            for x in range(6):
-                is_valid, _ = game.is_valid_move(x, y, card, player)
-                if is_valid:
-                    moves.append({"x": x, "y": y, "card": card})
+        value = card["value"]
+        moves.extend({"x": x, "y": y, "card": card} for x, y, beat in targets if beat < value)
     return moves
 
 
@@ -406,7 +444,7 @@ def play_match(match_num, wallet1, wallet2, agent1: MatchAgent, agent2: MatchAge
         return None
 
     # Get game ID
-    game_id = contract.functions.gameCounter().call()
+    game_id = created_game_id(receipt)
     print(f"   Game ID: {game_id}")
 
     # Step 2: Player 2 joins game
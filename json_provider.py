@@ -0,0 +1,69 @@
+"""
+orjson-backed JSON provider shared by the Flask apps.
+
+Install with `app.json = OrjsonProvider(app)` right after creating the app.
+jsonify() and request.get_json() then go through orjson; if orjson is not
+installed the stock Flask provider behaviour is kept.
+
+Socket.IO apps also pass `json=SocketIOJSON` to SocketIO() so event packets
+are encoded by orjson instead of going through flask.json per emit.
+"""
+
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson encoding/decoding when available."""
+
+    # Machine-to-machine payloads: no key sorting, never pretty-printed (Flask 3
+    # ignores the old JSON_SORT_KEYS / JSONIFY_PRETTYPRINT_REGULAR config keys)
+    sort_keys = False
+    compact = True
+
+    def _option(self) -> int:
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._option()).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        # orjson returns bytes, so hand them straight to the response without a str round-trip
+        body = orjson.dumps(obj, default=self.default, option=self._option())
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+class SocketIOJSON:
+    """json-module stand-in for python-socketio packets.
+    Its encoder passes separators=(',', ':'), which orjson's output already matches."""
+
+    @staticmethod
+    def dumps(obj, **kwargs) -> str:
+        if orjson is None:
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    @staticmethod
+    def loads(s, **kwargs):
+        if orjson is None:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
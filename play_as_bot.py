@@ -156,9 +156,9 @@ def on_game_start(data):
     print(f"\n  GAME STARTED!")
     print(f"  Current turn: {data.get('current_turn')}")
 
-    if my_role and data.get(my_role):
-        my_cards = data[my_role]['cards']
-        print(f"  My cards: {my_cards}")
+    my_role = data.get('your_role', my_role)
+    my_cards = data.get('your_cards', [])
+    print(f"  My cards: {my_cards}")
 
     my_turn = (data.get('current_turn') == my_role)
     if my_turn:
@@ -184,6 +184,14 @@ def on_game_state_restored(data):
         pick_and_send_move(data['board'], my_cards)
 
 
+@sio.on('hand_update')
+def on_hand_update(data):
+    global my_cards
+    # Only our own hand is sent, just before the matching move_made
+    if data.get('cards'):
+        my_cards = data['cards']
+
+
 @sio.on('move_made')
 def on_move_made(data):
     global my_cards, my_turn
@@ -194,12 +202,6 @@ def on_move_made(data):
         sio.disconnect()
         return
 
-    # Update my cards
-    if my_role == 'player1' and data.get('player1_cards'):
-        my_cards = data['player1_cards']
-    elif my_role == 'player2' and data.get('player2_cards'):
-        my_cards = data['player2_cards']
-
     next_turn = data.get('next_turn')
     print(f"  Next turn: {next_turn}, I am: {my_role}")
 
@@ -9,6 +9,10 @@ let gameState = {
     costEstimate: 0
 };
 
+// Polling for the AI's reply: give up after 2 minutes (hung API call or lost network)
+const AI_POLL_INTERVAL_MS = 500;
+const AI_MOVE_TIMEOUT_MS = 120000;
+
 // Initialize game
 document.addEventListener('DOMContentLoaded', function() {
     loadStats();
@@ -182,7 +186,7 @@ async function handleCellClick(row, col) {
             })
         });
 
-        const data = await response.json();
+        let data = await response.json();
 
         if (!response.ok) {
             alert(data.error || 'Invalid move');
@@ -199,6 +203,17 @@ async function handleCellClick(row, col) {
             return;
         }
 
+        // AI reply is computed in the background; poll until it's ready
+        if (response.status === 202) {
+            data = await waitForAIMove(data.task_id);
+            if (data.error) {
+                alert(data.error);
+                hideLoading();
+                return;
+            }
+            updateBoard(data.board);
+        }
+
         // Show AI move info
         if (data.ai_move) {
             displayAIMove(data.ai_move);
@@ -230,6 +245,18 @@ async function handleCellClick(row, col) {
     }
 }
 
+async function waitForAIMove(taskId) {
+    const deadline = Date.now() + AI_MOVE_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, AI_POLL_INTERVAL_MS));
+        const response = await fetch(`/api/move_result/${taskId}`);
+        if (response.status !== 202) {
+            return await response.json();
+        }
+    }
+    throw new Error('AI did not respond in time, please try again');
+}
+
 function updateBoard(boardState) {
     for (let row = 0; row < 6; row++) {
         for (let col = 0; col < 6; col++) {
@@ -211,8 +211,12 @@ function handleCellClick(row, col) {
 }
 
 function updateGameState(data) {
-    // Update board
-    updateBoard(data.board);
+    // Update board (move_made carries just the placed cell)
+    if (data.placed) {
+        updateCell(data.position[0], data.position[1], data.placed);
+    } else {
+        updateBoard(data.board);
+    }
 
     // Update cards
     if (gameState.playerRole === 'player1') {
@@ -233,22 +237,25 @@ function updateGameState(data) {
     }
 }
 
+function updateCell(row, col, cellData) {
+    const cell = document.querySelector(`[data-row="${row}"][data-col="${col}"]`);
+
+    if (cellData) {
+        cell.textContent = cellData.card;
+        cell.className = 'cell ' + cellData.player;
+        if (cellData.color) {
+            cell.classList.add('color-' + cellData.color);
+        }
+    } else {
+        cell.textContent = '';
+        cell.className = 'cell';
+    }
+}
+
 function updateBoard(boardState) {
     for (let row = 0; row < 6; row++) {
         for (let col = 0; col < 6; col++) {
-            const cell = document.querySelector(`[data-row="${row}"][data-col="${col}"]`);
-            const cellData = boardState[row][col];
-
-            if (cellData) {
-                cell.textContent = cellData.card;
-                cell.className = 'cell ' + cellData.player;
-                if (cellData.color) {
-                    cell.classList.add('color-' + cellData.color);
-                }
-            } else {
-                cell.textContent = '';
-                cell.className = 'cell';
-            }
+            updateCell(row, col, boardState[row][col]);
         }
     }
 }
@@ -16,6 +16,7 @@
         currentPlayer: null,  // 1 or 2
         moveHistory: [],      // {player, row, col, value, number}
         board: null,          // 6x6 array
+        boardSeq: null,       // board_seq of the last applied move
         matchInfo: null,      // {agent1, agent2, wager, game_id}
     };
 
@@ -91,6 +92,7 @@
         state.socket.on('connect_error', onConnectError);
 
         // Game events
+        state.socket.on('spectator_snapshot', onSpectatorSnapshot);
         state.socket.on('match_info', onMatchInfo);
         state.socket.on('game_start', onGameStart);
         state.socket.on('spectator_move', onSpectatorMove);
@@ -135,6 +137,14 @@
     // EVENT HANDLERS
     // ========================================================================
 
+    function onSpectatorSnapshot(data) {
+        // Late-join state in one event; each part is handled like its live counterpart
+        console.log('[Spectator] Snapshot received:', data);
+        if (data.match_info) onMatchInfo(data.match_info);
+        if (data.state) onGameStart(data.state);
+        if (data.result) onGameEnd(data.result);
+    }
+
     function onMatchInfo(data) {
         console.log('[Spectator] Match info received:', data);
         state.matchInfo = data;
@@ -178,6 +188,9 @@
         if (data.board) {
             renderFullBoard(data.board);
         }
+        if (data.board_seq !== undefined) {
+            state.boardSeq = data.board_seq;
+        }
 
         // Update current player
         if (data.current_player) {
@@ -194,7 +207,18 @@
 
     function onSpectatorMove(data) {
         console.log('[Spectator] Move received:', data);
+        const missed = state.boardSeq !== null && data.board_seq !== undefined &&
+            data.board_seq !== state.boardSeq + 1;
         handleMove(data);
+        if (data.board_seq !== undefined) {
+            state.boardSeq = data.board_seq;
+        }
+
+        // Moves are deltas; if one was missed, rejoin to get a full snapshot
+        if (missed) {
+            console.log('[Spectator] Missed a move, requesting snapshot');
+            state.socket.emit('join_spectate', { room_id: state.roomId });
+        }
     }
 
     function onSpectatorUpdate(data) {
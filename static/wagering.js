@@ -655,12 +655,17 @@ function initializeSocket() {
     });
 
     socket.on('ai_room_created', (data) => {
+        // Carries the initial game_state too; AI rooms get no separate game_start
         console.log('🤖 AI room created:', data);
+        hideLoading();
         gameState.roomId = data.room_id;
         gameState.mode = 'ai';
         gameState.playerRole = 'player1';
+        gameState.wager = data.game_state.wager;
         gameState.status = 'playing';
         saveSession();
+
+        startGameUI(data.game_state);
     });
 
     socket.on('game_start', (data) => {
@@ -684,6 +689,18 @@ function initializeSocket() {
         startGameUI(data);
     });
 
+    socket.on('result_submitted', (data) => {
+        // On-chain settlement finishes after the winning move_made
+        console.log('⛓️ Result submitted:', data);
+        updateTxStatus(`✅ Result settled on-chain (tx ${data.tx_hash.slice(0, 10)}…)`);
+    });
+
+    socket.on('hand_update', (data) => {
+        // Sent only to this player, just before the matching move_made
+        gameState.myCards = data.cards;
+        renderMyCards(data.cards);
+    });
+
     socket.on('move_made', (data) => {
         console.log('Move made:', data);
         updateGameState(data);
@@ -788,18 +805,18 @@ function startGameUI(data) {
 
     // Set cards based on role
     if (gameState.playerRole === 'player1') {
-        const myCards = data.your_cards || data.player1.cards;
+        const myCards = data.your_cards;
         renderMyCards(myCards);
         gameState.myCards = myCards;
         document.getElementById('player2-cards-count-wager').textContent = 
-            (data.player2.cards || []).length;
+            data.player2.cards_count;
         gameState.myTurn = (data.current_turn === 'player1');
     } else {
-        const myCards = data.your_cards || data.player2.cards;
+        const myCards = data.your_cards;
         renderMyCards(myCards);
         gameState.myCards = myCards;
         document.getElementById('player2-cards-count-wager').textContent = 
-            (data.player1.cards || []).length;
+            data.player1.cards_count;
         gameState.myTurn = (data.current_turn === 'player2');
     }
 
@@ -943,16 +960,9 @@ function updateGameState(data) {
     updateBoard(data.board);
     gameState.boardState = data.board;
 
-    // Update cards
-    if (gameState.playerRole === 'player1') {
-        renderMyCards(data.player1_cards);
-        gameState.myCards = data.player1_cards;
-        document.getElementById('player2-cards-count-wager').textContent = data.player2_cards.length;
-    } else {
-        renderMyCards(data.player2_cards);
-        gameState.myCards = data.player2_cards;
-        document.getElementById('player2-cards-count-wager').textContent = data.player1_cards.length;
-    }
+    // Own cards arrive separately via hand_update; move_made only carries hand sizes
+    const opponentRole = gameState.playerRole === 'player1' ? 'player2' : 'player1';
+    document.getElementById('player2-cards-count-wager').textContent = data.hand_counts[opponentRole];
 
     // Update turn
     const wasMyTurn = gameState.myTurn;
@@ -86,11 +86,8 @@ class AIPlayer:
         
         @self.sio.on('game_start')
         def on_game_start(data):
-            self.role = 'player1' if self.player_id == 'player1' else 'player2'
-            if self.role == 'player1':
-                self.my_cards = data['player1']['cards']
-            else:
-                self.my_cards = data['player2']['cards']
+            self.role = data.get('your_role', self.role)
+            self.my_cards = data['your_cards']
             self.my_turn = (data['current_turn'] == self.role)
             self._update_board(data['board'])
             self.game_started.set()
@@ -113,15 +110,14 @@ class AIPlayer:
             if self.my_turn and not self.game_over:
                 self._make_move()
         
+        @self.sio.on('hand_update')
+        def on_hand_update(data):
+            self.my_cards = data['cards']
+        
         @self.sio.on('move_made')
         def on_move_made(data):
             self._update_board(data['board'])
             
-            if self.role == 'player1':
-                self.my_cards = data['player1_cards']
-            else:
-                self.my_cards = data['player2_cards']
-            
             self.my_turn = (data['next_turn'] == self.role)
             
             if data.get('winner'):
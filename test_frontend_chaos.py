@@ -127,6 +127,11 @@ class GameClient:
             self._update_state(data)
             log(f"[{self.name}] State restored! Cards={self.my_cards}", "DEBUG")
         
+        @self.sio.on('hand_update')
+        def on_hand_update(data):
+            self.events_received.append(('hand_update', data))
+            self.my_cards = data.get('cards', [])
+        
         @self.sio.on('move_made')
         def on_move_made(data):
             self.events_received.append(('move_made', data))
@@ -155,18 +160,14 @@ class GameClient:
         self.role = data.get('your_role', self.role)
         
         if self.role == 'player1':
-            self.my_cards = data.get('your_cards') or data.get('player1', {}).get('cards', [])
+            self.my_cards = data.get('your_cards', [])
             self.my_turn = data.get('current_turn') == 'player1'
         else:
-            self.my_cards = data.get('your_cards') or data.get('player2', {}).get('cards', [])
+            self.my_cards = data.get('your_cards', [])
             self.my_turn = data.get('current_turn') == 'player2'
     
     def _update_after_move(self, data):
         self.board = data.get('board')
-        if self.role == 'player1':
-            self.my_cards = data.get('player1_cards', [])
-        else:
-            self.my_cards = data.get('player2_cards', [])
         self.my_turn = data.get('next_turn') == self.role
     
     def connect(self):
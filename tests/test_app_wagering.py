@@ -0,0 +1,65 @@
+"""app_wagering board caching and arena-start rate limiting."""
+
+import random
+
+import pytest
+
+pytest.importorskip("flask_socketio")
+pytest.importorskip("eventlet")
+pytest.importorskip("web3")
+
+import app_wagering
+from game_logic import PuntoGame
+from hackathon_matches import valid_moves
+
+
+def test_room_board_patch_matches_full_format():
+    rng = random.Random(7)
+    for _ in range(200):
+        game = PuntoGame()
+        room = {}
+        player = 'claude'
+        previous = app_wagering.room_board(room, game)
+        while not game.is_game_over():
+            moves = valid_moves(game, player)
+            if not moves:
+                break
+            move = rng.choice(moves)
+            snapshot = [row[:] for row in previous]
+            game.make_move(move["x"], move["y"], move["card"], player)
+
+            board = app_wagering.room_board(room, game)
+            assert board == app_wagering.format_board(game.board)
+            # Copy-on-write: a board already handed out is never patched in place
+            assert previous == snapshot
+            previous = board
+            player = 'openai' if player == 'claude' else 'claude'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app_wagering.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(app_wagering, "arena_start_buckets", {})
+    monkeypatch.setattr(app_wagering, "arena_buckets_swept", now[0])
+    return now
+
+
+def test_arena_start_bucket_allows_burst_then_refills(clock):
+    take = app_wagering.take_arena_start_token
+    for _ in range(app_wagering.ARENA_START_BURST):
+        assert take('1.2.3.4')
+    assert not take('1.2.3.4')
+    assert take('5.6.7.8')  # buckets are per client
+
+    clock[0] += 1 / app_wagering.ARENA_START_RATE
+    assert take('1.2.3.4')
+    assert not take('1.2.3.4')
+
+
+def test_idle_arena_start_buckets_are_evicted(clock):
+    take = app_wagering.take_arena_start_token
+    take('1.2.3.4')
+    clock[0] += app_wagering.ARENA_BUCKET_IDLE
+    take('5.6.7.8')
+    assert list(app_wagering.arena_start_buckets) == ['5.6.7.8']
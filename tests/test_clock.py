@@ -0,0 +1,20 @@
+"""clock.now_iso caching."""
+
+from datetime import datetime
+
+import clock
+
+
+def test_now_iso_reuses_string_within_a_second(monkeypatch):
+    monkeypatch.setattr(clock.time, "time", lambda: 1_700_000_000.2)
+    first = clock.now_iso()
+    monkeypatch.setattr(clock.time, "time", lambda: 1_700_000_000.9)
+    assert clock.now_iso() is first
+    assert first == datetime.fromtimestamp(1_700_000_000).isoformat()
+
+
+def test_now_iso_rolls_over_on_the_next_second(monkeypatch):
+    monkeypatch.setattr(clock.time, "time", lambda: 1_700_000_000.9)
+    clock.now_iso()
+    monkeypatch.setattr(clock.time, "time", lambda: 1_700_000_001.0)
+    assert clock.now_iso() == datetime.fromtimestamp(1_700_000_001).isoformat()
@@ -0,0 +1,52 @@
+"""PuntoGame win detection and hand caching."""
+
+import random
+
+from game_logic import PuntoGame, _color_to_player
+
+
+def full_scan_winner(board):
+    """The old full-board scan: any 5 same-color cells in a row/column/diagonal."""
+    for color in ('red', 'blue', 'green', 'yellow'):
+        for dx, dy in ((1, 0), (0, 1), (1, 1), (-1, 1)):
+            for y in range(6):
+                for x in range(6):
+                    cells = [(x + i * dx, y + i * dy) for i in range(5)]
+                    if all(0 <= cx < 6 and 0 <= cy < 6 and board[cy][cx] is not None
+                           and board[cy][cx]['color'] == color for cx, cy in cells):
+                        return _color_to_player(color)
+    return None
+
+
+def random_move(game, player, rng):
+    moves = [(x, y, card) for card in game.get_hand(player) for y in range(6) for x in range(6)
+             if game.is_valid_move(x, y, card, player)[0]]
+    return rng.choice(moves) if moves else None
+
+
+def test_check_winner_at_matches_full_scan():
+    rng = random.Random(1234)
+    for _ in range(300):
+        game = PuntoGame()
+        player = 'claude'
+        while not game.is_game_over():
+            move = random_move(game, player, rng)
+            if move is None:
+                break
+            game.make_move(*move, player)
+            assert game.winner == full_scan_winner(game.board)
+            player = 'openai' if player == 'claude' else 'claude'
+
+
+def test_sorted_hand_follows_replaced_hand():
+    game = PuntoGame()
+    first = game.get_sorted_hand('claude')
+    assert [c['value'] for c in first] == sorted((c['value'] for c in game.hand_claude), reverse=True)
+
+    game.hand_claude = [{'value': 1, 'color': 'red'}, {'value': 9, 'color': 'blue'}]
+    assert game.get_sorted_hand('claude') == ({'value': 9, 'color': 'blue'}, {'value': 1, 'color': 'red'})
+
+
+def test_sorted_hand_is_immutable():
+    game = PuntoGame()
+    assert isinstance(game.get_sorted_hand('openai'), tuple)
@@ -0,0 +1,33 @@
+"""hackathon_matches move generation."""
+
+import random
+
+import pytest
+
+pytest.importorskip("web3")
+
+from game_logic import CARD_VALUE, PuntoGame
+from hackathon_matches import valid_moves
+
+
+def valid_moves_reference(game, player):
+    """valid_moves written as the plain is_valid_move loop it replaced."""
+    hand = sorted(game.get_hand(player), key=CARD_VALUE, reverse=True)
+    return [{"x": x, "y": y, "card": card}
+            for card in hand for y in range(6) for x in range(6)
+            if game.is_valid_move(x, y, card, player)[0]]
+
+
+def test_valid_moves_matches_is_valid_move_loop():
+    rng = random.Random(99)
+    for _ in range(100):
+        game = PuntoGame()
+        player = 'claude'
+        while not game.is_game_over():
+            moves = valid_moves(game, player)
+            assert moves == valid_moves_reference(game, player)
+            if not moves:
+                break
+            move = rng.choice(moves)
+            game.make_move(move["x"], move["y"], move["card"], player)
+            player = 'openai' if player == 'claude' else 'claude'
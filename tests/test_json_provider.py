@@ -0,0 +1,31 @@
+"""orjson-backed JSON for Flask responses and Socket.IO packets."""
+
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+
+from flask import Flask
+
+from json_provider import OrjsonProvider, SocketIOJSON
+
+PAYLOAD = {'board': [[None, {'card': 3, 'player': 'player1', 'color': 'red'}]], 'hands': {1: 2, 2: 18}}
+
+
+def test_socketio_json_round_trip():
+    # Integer keys are stringified, like the stdlib encoder does
+    assert SocketIOJSON.loads(SocketIOJSON.dumps(PAYLOAD)) == json.loads(json.dumps(PAYLOAD))
+
+
+def test_socketio_json_accepts_encoder_kwargs():
+    assert json.loads(SocketIOJSON.dumps(PAYLOAD, separators=(',', ':'))) == json.loads(json.dumps(PAYLOAD))
+
+
+def test_orjson_provider_response():
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    with app.app_context():
+        response = app.json.response(PAYLOAD)
+        assert response.mimetype == 'application/json'
+        assert json.loads(response.get_data()) == json.loads(json.dumps(PAYLOAD))